@@ -1,28 +1,98 @@
 # sidecar/sidecar/agent/agent.py
 from __future__ import annotations
 
+import asyncio
 import os
 import time
-import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Sequence
+
+import orjson
 
 from ..utils.env import load_env
 from ..utils.config import load_config
 from ..utils.schema import LogEvent
+from ..utils.shell import tokenize
 from ..rag.retriever import retrieve
-from ..extract.generic import extract_from_file, extract_from_text, merge_facts
+from ..extract.generic import scan_file, scan_text
 from ..providers.local_ollama import plan_with_ollama
 from ..providers.openai_client import plan_with_openai
 from ..providers.anthropic_client import plan_with_anthropic
+from .plan_cache import PlanCache
 from rich import print
 
+try:  # optional: kernel-driven wakeups on Linux
+    from inotify_simple import INotify, flags as inotify_flags
+except Exception:  # not installed / non-Linux -> fixed-interval polling
+    INotify = None
+
+# provider calls allowed in flight at once (each holds a worker thread)
+_MAX_INFLIGHT = 8
+
+
+class _SessionTail:
+    """
+    Follow the session log through one persistent descriptor.
+    Sleeps on inotify IN_MODIFY when available, otherwise polls every `poll` seconds.
+    A torn trailing write is held back until its newline arrives; rotation
+    (new inode) or truncation reopens the log from the start.
+    """
 
-def _read_new_lines(path: str, pos: int):
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        f.seek(pos)
-        lines = f.readlines()
-        pos = f.tell()
-    return lines, pos
+    def __init__(self, path: str, poll: float = 0.35):
+        self.path = path
+        self.poll = poll
+        self._fd = -1
+        self._ino = 0
+        self._buf = bytearray()
+        self._inotify = INotify() if INotify is not None else None
+        self._open()
+
+    def _open(self) -> None:
+        self._fd = os.open(self.path, os.O_RDONLY)
+        self._ino = os.fstat(self._fd).st_ino
+        self._buf = bytearray()
+        if self._inotify is not None:
+            try:
+                self._inotify.add_watch(self.path, inotify_flags.MODIFY)
+            except OSError:
+                self._inotify = None
+
+    def _rotated(self) -> bool:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False  # mid-rotation; keep the old descriptor until the new file appears
+        return st.st_ino != self._ino or st.st_size < os.lseek(self._fd, 0, os.SEEK_CUR)
+
+    def _drain(self) -> List[str]:
+        while True:
+            chunk = os.read(self._fd, 65536)
+            if not chunk:
+                break
+            self._buf += chunk
+        if b"\n" not in self._buf:
+            return []
+        *lines, self._buf = self._buf.split(b"\n")
+        return [l.decode("utf-8", errors="ignore") for l in lines]
+
+    def read_lines(self) -> List[str]:
+        lines = self._drain()
+        if self._rotated():
+            os.close(self._fd)
+            self._open()
+            lines += self._drain()
+        return lines
+
+    def wait(self, timeout: float = 1.0) -> None:
+        """Block until the kernel reports new data (or `timeout`), or one poll interval."""
+        if self._inotify is None:
+            time.sleep(self.poll)
+            return
+        self._inotify.read(timeout=int(timeout * 1000))
+
+    def close(self) -> None:
+        os.close(self._fd)
+        if self._inotify is not None:
+            self._inotify.close()
 
 
 def _resolve_path(p: str, cwd: str) -> str:
@@ -32,35 +102,38 @@ def _resolve_path(p: str, cwd: str) -> str:
     return p
 
 
-def _detect_output_paths(parts: List[str], cwd: str) -> List[str]:
+# flags whose next token is an output path (shell redirect included)
+_PATH_FLAGS = frozenset(("--json", "--jsonl", "--xml", "-o", "-oX", "-oN", "-oG", ">"))
+
+
+def _detect_output_paths(parts: Sequence[str], cwd: str) -> List[str]:
     """Generic detection of output file flags and shell redirects; no tool assumptions."""
     out: List[str] = []
-    i = 0
-    while i < len(parts):
+    i, n = 0, len(parts)
+    while i < n:
         t = parts[i]
-        nxt = parts[i + 1] if i + 1 < len(parts) else None
+        nxt = parts[i + 1] if i + 1 < n else None
 
-        if t in ("--json", "--jsonl", "--xml", "-o", "-oX", "-oN", "-oG") and nxt:
-            out.append(_resolve_path(nxt, cwd))
+        if t in _PATH_FLAGS and nxt:
+            out.append(nxt)
             i += 2
             continue
 
         if t.startswith("--output="):
-            out.append(_resolve_path(t.split("=", 1)[1], cwd))
+            out.append(t[9:])
         elif t.startswith("-o") and len(t) > 2 and not t.startswith("-oX"):
-            out.append(_resolve_path(t[2:], cwd))
-        elif t == ">" and nxt:
-            out.append(_resolve_path(nxt, cwd))
+            out.append(t[2:])
         i += 1
 
-    return [p for p in out if os.path.exists(p)]
+    # dedup before touching the filesystem: `-o out.txt > out.txt` stats once
+    return [p for p in dict.fromkeys(_resolve_path(p, cwd) for p in out) if os.path.exists(p)]
 
 
 def _recent_events(session_path: str, limit: int = 20) -> List[dict]:
     try:
-        with open(session_path, "r", encoding="utf-8", errors="ignore") as f:
+        with open(session_path, "rb") as f:
             lines = f.readlines()[-limit:]
-        return [json.loads(l) for l in lines if l.strip().startswith("{")]
+        return [orjson.loads(l) for l in lines if l.strip().startswith(b"{")]
     except Exception:
         return []
 
@@ -83,6 +156,163 @@ def _coerce_plan(obj: Any) -> Dict[str, Any]:
     return plan
 
 
+def _build_payload(evt: LogEvent, session_path: str, profile: str) -> tuple[Dict[str, Any], Dict[str, Any]]:
+    """Extract facts for one event and assemble the provider payload."""
+    # ---- GENERIC FACT EXTRACTION (no tool recognizers, no canned logic) ----
+    # learn from the command string itself
+    facts = scan_text(evt.cmd)
+
+    # learn from files the command produced (flags/redirects)
+    for pth in _detect_output_paths(tokenize(evt.cmd), evt.cwd or ""):
+        facts.merge(scan_file(pth))
+
+    # also learn from stdout/stderr captured via 'sc' wrapper
+    if evt.out and os.path.exists(evt.out):
+        facts.merge(scan_file(evt.out))
+
+    # retrieval: derive soft topics, then pull methodology chunks
+    topics: List[str] = []
+    if facts.urls or facts.domains:
+        topics.append("Web")
+    if facts.ips or facts.ports:
+        topics.append("Network")
+    if facts.cves:
+        topics.append("Vulnerabilities")
+    if facts.pairs or facts.passwords:
+        topics.append("Credentials")
+    if not topics:
+        topics.append("General")
+
+    retrieved = []
+    for t in topics[:3]:
+        retrieved.extend(retrieve(t, k=1))
+
+    payload = {
+        "profile": profile,
+        "recent_events": _recent_events(session_path, limit=12),
+        "last_cmd": evt.cmd,
+        "cwd": evt.cwd,
+        "exit": evt.exit,
+        "parsed_facts": facts.to_dict(),  # generic, tool-agnostic; serialized once, reused for the audit record
+        "retrieved_snippets": [
+            {"title": r["title"], "gist": r["text"][:240], "cite_id": r["id"]}
+            for r in retrieved[:4]
+        ],
+    }
+    return payload["parsed_facts"], payload
+
+
+def _call_provider(provider: str, model: str, payload: Dict[str, Any], allow_cloud: bool) -> Any:
+    try:
+        if provider == "local":
+            return plan_with_ollama(model=model, payload=payload)
+        if provider == "openai":
+            return plan_with_openai(model=model, payload=payload, allow_cloud=allow_cloud)
+        if provider == "anthropic":
+            return plan_with_anthropic(model=model, payload=payload, allow_cloud=allow_cloud)
+        return {"next_actions": [], "notes": [f"unknown provider {provider}"], "escalation_paths": []}
+    except Exception as e:
+        return {"next_actions": [], "notes": [f"model_error:{e}"], "escalation_paths": []}
+
+
+async def _agent_loop(
+    tail: _SessionTail,
+    audit_fd: int,
+    plan_cache: PlanCache,
+    session_path: str,
+    provider: str,
+    profile: str,
+    model: str,
+    dry_run: bool,
+    allow_cloud: bool,
+) -> None:
+    """
+    Reader/writer pair around the session tail.
+    - the reader extracts facts inline and starts one task per event, so a slow
+      provider call never holds up extraction of the lines queued behind it
+    - provider calls (blocking HTTP) run in worker threads, at most
+      _MAX_INFLIGHT at once
+    - the writer awaits tasks in arrival order, so audit.jsonl keeps log order;
+      records that are ready together go out in one write(), and none waits
+      behind a provider call that is still running
+    """
+    inflight = asyncio.Semaphore(_MAX_INFLIGHT)
+    pending: "asyncio.Queue[asyncio.Task]" = asyncio.Queue()
+
+    async def handle_event(evt: LogEvent) -> tuple[LogEvent, Dict[str, Any], Dict[str, Any]]:
+        facts, payload = _build_payload(evt, session_path, profile)
+
+        # Call the chosen provider (or dry-run / reuse a cached plan)
+        cached = None if dry_run else plan_cache.get(provider, model, payload)
+        if dry_run:
+            plan = {"next_actions": [], "notes": ["dry-run enabled: no model call"], "escalation_paths": []}
+        elif cached is not None:
+            plan = cached[0]
+        else:
+            async with inflight:
+                plan = await asyncio.to_thread(_call_provider, provider, model, payload, allow_cloud)
+
+        plan = _coerce_plan(plan)
+        if cached is not None:
+            plan["notes"].append(f"plan_cache:{cached[1]}")
+        elif not dry_run and plan["next_actions"]:
+            plan_cache.put(provider, model, payload, _coerce_plan(plan))
+        return evt, facts, plan
+
+    async def reader() -> None:
+        while True:
+            try:
+                for line in tail.read_lines():
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        evt = LogEvent.from_json(line)
+                    except Exception:
+                        continue
+                    pending.put_nowait(asyncio.create_task(handle_event(evt)))
+                    await asyncio.sleep(0)  # let earlier events reach their provider call
+                await asyncio.to_thread(tail.wait)
+            except Exception as e:
+                print(f"[red][!] Agent error: {e}[/red]")
+                await asyncio.sleep(1.0)
+
+    async def writer() -> None:
+        batch: List[bytes] = []
+        while True:
+            if batch and pending.empty():
+                os.write(audit_fd, b"".join(batch))
+                batch.clear()
+            task = await pending.get()
+            if batch and not task.done():
+                os.write(audit_fd, b"".join(batch))
+                batch.clear()
+            try:
+                evt, facts, plan = await task
+            except Exception as e:
+                print(f"[red][!] Agent error: {e}[/red]")
+                continue
+
+            batch.append(
+                orjson.dumps(
+                    {"ts": evt.ts, "cmd": evt.cmd, "cwd": evt.cwd, "exit": evt.exit, "facts": facts, "plan": plan},
+                    option=orjson.OPT_APPEND_NEWLINE,
+                )
+            )
+
+            # print summary to agent log for debugging (no heuristic injection)
+            if plan.get("next_actions"):
+                for i, na in enumerate(plan["next_actions"], 1):
+                    print(
+                        f"[green][{i}] {na.get('cmd','')}[/green] - {na.get('reason','')} "
+                        f"(noise={na.get('noise','')}, safety={na.get('safety','')})"
+                    )
+            if plan.get("notes"):
+                print("[yellow]Notes:[/yellow]", "; ".join(plan["notes"]))
+
+    await asyncio.gather(reader(), writer())
+
+
 def run_agent(
     provider: str | None = None,
     profile: str | None = None,
@@ -106,7 +336,8 @@ def run_agent(
     session_path = os.path.expanduser(session or cfg["logging"]["session_log"])
     audit_path = os.path.expanduser(audit or cfg["logging"]["audit_log"])
     os.makedirs(os.path.dirname(audit_path), exist_ok=True)
-    open(audit_path, "a").close()
+    # one append-only descriptor for the agent's lifetime; each record is a single write()
+    audit_fd = os.open(audit_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
     open(session_path, "a").close()
 
     # Resolve provider/profile/model strictly from env unless CLI provided overrides
@@ -126,105 +357,12 @@ def run_agent(
         f"profile={profile} model={model} dry_run={dry_run}"
     )
 
-    pos = 0
-    while True:
-        try:
-            lines, pos = _read_new_lines(session_path, pos)
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-
-                try:
-                    evt = LogEvent.model_validate_json(line)
-                except Exception:
-                    continue
-
-                # ---- GENERIC FACT EXTRACTION (no tool recognizers, no canned logic) ----
-                facts: Dict[str, Any] = {}
-                # learn from the command string itself
-                facts = merge_facts(facts, extract_from_text(evt.cmd))
-
-                # learn from files the command produced (flags/redirects)
-                parts = evt.cmd.split()
-                for pth in _detect_output_paths(parts, evt.cwd or ""):
-                    facts = merge_facts(facts, extract_from_file(pth))
-
-                # also learn from stdout/stderr captured via 'sc' wrapper
-                if evt.out and os.path.exists(evt.out):
-                    facts = merge_facts(facts, extract_from_file(evt.out))
-
-                # retrieval: derive soft topics, then pull methodology chunks
-                topics: List[str] = []
-                ents = facts.get("entities", {})
-                if ents.get("urls") or ents.get("domains"):
-                    topics.append("Web")
-                if ents.get("ips") or facts.get("artifacts", {}).get("ports"):
-                    topics.append("Network")
-                if facts.get("vulns", {}).get("cves"):
-                    topics.append("Vulnerabilities")
-                if facts.get("creds", {}).get("pairs") or facts.get("creds", {}).get("passwords"):
-                    topics.append("Credentials")
-                if not topics:
-                    topics.append("General")
-
-                retrieved = []
-                for t in topics[:3]:
-                    retrieved.extend(retrieve(t, k=1))
-
-                payload = {
-                    "profile": profile,
-                    "recent_events": _recent_events(session_path, limit=12),
-                    "last_cmd": evt.cmd,
-                    "cwd": evt.cwd,
-                    "exit": evt.exit,
-                    "parsed_facts": facts,  # generic, tool-agnostic
-                    "retrieved_snippets": [
-                        {"title": r["title"], "gist": r["text"][:240], "cite_id": r["id"]}
-                        for r in retrieved[:4]
-                    ],
-                }
-
-                # Call the chosen provider (or dry-run)
-                if dry_run:
-                    plan = {"next_actions": [], "notes": ["dry-run enabled: no model call"], "escalation_paths": []}
-                else:
-                    try:
-                        if provider == "local":
-                            plan = plan_with_ollama(model=model, payload=payload)
-                        elif provider == "openai":
-                            plan = plan_with_openai(model=model, payload=payload, allow_cloud=allow_cloud)
-                        elif provider == "anthropic":
-                            plan = plan_with_anthropic(model=model, payload=payload, allow_cloud=allow_cloud)
-                        else:
-                            plan = {"next_actions": [], "notes": [f"unknown provider {provider}"], "escalation_paths": []}
-                    except Exception as e:
-                        plan = {"next_actions": [], "notes": [f"model_error:{e}"], "escalation_paths": []}
-
-                plan = _coerce_plan(plan)
-
-                with open(audit_path, "a", encoding="utf-8") as af:
-                    af.write(
-                        json.dumps(
-                            {"ts": evt.ts, "cmd": evt.cmd, "cwd": evt.cwd, "exit": evt.exit, "facts": facts, "plan": plan}
-                        )
-                        + "\n"
-                    )
-
-                # print summary to agent log for debugging (no heuristic injection)
-                if plan.get("next_actions"):
-                    for i, na in enumerate(plan["next_actions"], 1):
-                        print(
-                            f"[green][{i}] {na.get('cmd','')}[/green] - {na.get('reason','')} "
-                            f"(noise={na.get('noise','')}, safety={na.get('safety','')})"
-                        )
-                if plan.get("notes"):
-                    print("[yellow]Notes:[/yellow]", "; ".join(plan["notes"]))
-
-            time.sleep(0.35)
-        except KeyboardInterrupt:
-            print("\nbye")
-            break
-        except Exception as e:
-            print(f"[red][!] Agent error: {e}[/red]")
-            time.sleep(1.0)
+    plan_cache = PlanCache.from_env()
+    tail = _SessionTail(session_path)
+    try:
+        asyncio.run(_agent_loop(tail, audit_fd, plan_cache, session_path, provider, profile, model, dry_run, allow_cloud))
+    except KeyboardInterrupt:
+        print("\nbye")
+    finally:
+        tail.close()
+        os.close(audit_fd)
@@ -0,0 +1,90 @@
+# sidecar/sidecar/agent/plan_cache.py
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+
+from ..utils.shell import tokenize
+
+
+def _digest(obj: Any) -> bytes:
+    return hashlib.blake2b(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS), digest_size=16).digest()
+
+
+class PlanCache:
+    """
+    Reuse plans for repeated events instead of paying another model round-trip.
+
+    - exact: same provider/model and same model-visible payload (event timestamps
+      and output-file pointers are ignored, they never change the advice)
+    - near: same context (profile, cwd, exit, parsed facts, snippets) and the
+      same last_cmd tokens once whitespace and shell quoting are normalized;
+      only the recent history differs. Any changed argument is a miss.
+
+    Entries expire after `ttl` seconds; ttl <= 0 disables the cache.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # exact key -> (stored_at, near key, plan)
+        self._entries: "OrderedDict[bytes, Tuple[float, bytes, Dict[str, Any]]]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "PlanCache":
+        return cls(ttl=float(os.environ.get("AIC_PLAN_CACHE_TTL", "300")))
+
+    def _keys(self, provider: str, model: str, payload: Dict[str, Any]) -> Tuple[bytes, bytes]:
+        context = {
+            "provider": provider,
+            "model": model,
+            "profile": payload.get("profile"),
+            "cwd": payload.get("cwd"),
+            "exit": payload.get("exit"),
+            "facts": payload.get("parsed_facts"),
+            "snippets": payload.get("retrieved_snippets"),
+        }
+        recent = [
+            {"cmd": e.get("cmd"), "exit": e.get("exit"), "cwd": e.get("cwd")}
+            for e in payload.get("recent_events") or []
+            if isinstance(e, dict)
+        ]
+        ctx_key = _digest(context)
+        last_cmd = payload.get("last_cmd")
+        exact_key = _digest([ctx_key.hex(), last_cmd, recent])
+        near_key = _digest([ctx_key.hex(), list(tokenize(str(last_cmd or "")))])
+        return exact_key, near_key
+
+    def get(self, provider: str, model: str, payload: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Return (plan, "exact"|"near") or None."""
+        if self.ttl <= 0:
+            return None
+        now = time.monotonic()
+        while self._entries:
+            stored_at = next(iter(self._entries.values()))[0]
+            if now - stored_at <= self.ttl:
+                break
+            self._entries.popitem(last=False)
+
+        exact_key, near_key = self._keys(provider, model, payload)
+        hit = self._entries.get(exact_key)
+        if hit is not None:
+            return hit[2], "exact"
+        for _, other, plan in reversed(self._entries.values()):
+            if other == near_key:
+                return plan, "near"
+        return None
+
+    def put(self, provider: str, model: str, payload: Dict[str, Any], plan: Dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        exact_key, near_key = self._keys(provider, model, payload)
+        self._entries.pop(exact_key, None)
+        self._entries[exact_key] = (time.monotonic(), near_key, plan)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
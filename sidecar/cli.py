@@ -3,7 +3,6 @@ from __future__ import annotations
 
 import argparse
 import sys
-from .agent.agent import run_agent
 
 
 def _run_ui(path: str) -> None:
@@ -53,6 +52,7 @@ def main() -> int:
     args = p.parse_args()
 
     if args.cmd == "agent":
+        from .agent.agent import run_agent
         run_agent(provider=args.provider, profile=args.profile, dry_run=args.dry_run, allow_cloud=args.allow_cloud)
         return 0
     if args.cmd == "ui":
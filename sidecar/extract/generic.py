@@ -1,111 +1,292 @@
-import os, re
-from typing import Dict, Any, List
+import hashlib, os, re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Set
+
+try:  # optional: google-re2 scans in linear time (no backtracking on hostile output)
+    import re2
+except Exception:
+    re2 = None
+
+
+def _compile(pattern, flags: int = 0):
+    """Compile with RE2 when installed (same syntax/match semantics here), else stdlib re."""
+    if re2 is not None:
+        try:
+            prefix = "(?i)" if flags & re.I else ""
+            return re2.compile((prefix.encode() if isinstance(pattern, bytes) else prefix) + pattern)
+        except Exception:
+            pass
+    return re.compile(pattern, flags)
+
 
 # generic, semantic extractors (no tool names)
-RE_IPV4  = re.compile(r'\b(?:(?:25[0-5]|2[0-4]\d|[01]?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|[01]?\d?\d)\b')
-RE_IPV6  = re.compile(r'\b(?:[A-F0-9]{1,4}:){1,7}[A-F0-9]{1,4}\b', re.I)
-RE_URL   = re.compile(r'https?://[^\s\'"]+', re.I)
-RE_DOM   = re.compile(r'\b(?:(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63})\b', re.I)
-RE_EMAIL = re.compile(r'\b[a-z0-9._%+\-]+@[a-z0-9.\-]+\.[a-z]{2,63}\b', re.I)
-RE_CVE   = re.compile(r'\bCVE-\d{4}-\d{4,7}\b', re.I)
-
-RE_PORT_LINE = re.compile(r'\b(?:port|open|listening|closed|filtered)[^\n]{0,50}\b(\d{1,5})\b', re.I)
-RE_SERVICE   = re.compile(r'\b(ssh|rdp|ftp|smtp|imap|pop3|http|https|smb|ldap|kerberos|dns|mysql|mssql|postgres|ntp|snmp|telnet)\b', re.I)
-
-RE_USERPASS  = re.compile(r'\b(user(name)?|login)[\s:=]+([^\s:]+)\b.*?\b(pass(word)?)[\s:=]+([^\s]+)\b', re.I)
-RE_PAIR      = re.compile(r'\b([A-Za-z0-9._\-]{1,64})[:|/]([^\s]{1,128})\b')  # loose: user:pass or user/pass
-RE_FILEPATH  = re.compile(r'\b(/[^ \t\n\r\f\v]+|[A-Za-z]:\\[^ \t\n\r\f\v]+)\b')
-RE_BANNER    = re.compile(r'\b(Server:|X-Powered-By:|ssh-[0-9.]+|OpenSSH[_/][0-9.]+|nginx/[0-9.]+|Apache/[0-9.]+)\b.*', re.I)
-RE_ERROR     = re.compile(r'\b(denied|forbidden|unauthorized|timeout|timed out|refused|connection reset|no route|not found|exception|traceback|stack trace)\b', re.I)
-
-def _empty() -> Dict[str, Any]:
-    return {
-        "entities": {"ips": [], "ipv6": [], "urls": [], "domains": [], "emails": []},
-        "artifacts": {"ports": [], "services": [], "files": [], "banners": []},
-        "vulns": {"cves": []},
-        "creds": {"usernames": [], "passwords": [], "pairs": []},
-        "errors": [],
-        "indicators": []
-    }
-
-def _extend_unique(a: List, b: List):
-    seen = set(a)
-    for x in b:
-        if x not in seen:
-            a.append(x); seen.add(x)
-
-def merge_facts(base: Dict[str, Any], incoming: Dict[str, Any]) -> Dict[str, Any]:
-    if not base:
-        base = _empty()
-    if not incoming:
-        return base
-    # shallow/deep merge for our simple shapes
-    for k in base:
-        if isinstance(base[k], dict) and isinstance(incoming.get(k, None), dict):
-            for sk in base[k]:
-                _extend_unique(base[k][sk], incoming[k].get(sk, []))
-        elif isinstance(base[k], list):
-            _extend_unique(base[k], incoming.get(k, []))
-    # add any new top-level keys (future-proof)
-    for k, v in incoming.items():
-        if k not in base:
-            base[k] = v
-    return base
+# Token-like entities are fused into one alternation and scanned in a single pass.
+# Where spans start at the same offset the longer kind is listed first: a URL or
+# email over its host, a domain over the IP it begins with (10.10.14.3.nip.io).
+_ENTITY_PATTERNS = [
+    ("url",    r'https?://[^\s\'"]+'),
+    ("email",  r'\b[a-z0-9._%+\-]+@[a-z0-9.\-]+\.[a-z]{2,63}\b'),
+    ("domain", r'\b(?:(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63})\b'),
+    ("ipv4",   r'\b(?:(?:25[0-5]|2[0-4]\d|[01]?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|[01]?\d?\d)\b'),
+    ("cve",    r'\bCVE-\d{4}-\d{4,7}\b'),
+]
+_ENTITY_NAMES = [name for name, _ in _ENTITY_PATTERNS]  # m.lastindex - 1 -> name
+# ipv6 runs as its own pass: its spans overlap IPv4 ones across the colon
+# ("10.0.0.1:445" also reads as "1:445"), which no alternation can report
+_IPV6 = r'\b(?:[A-F0-9]{1,4}:){1,7}[A-F0-9]{1,4}\b'
+# A span of these kinds hides the other entities inside it (a CVE or domain in a URL
+# path, a domain's leading IP). Each such span is rescanned with those patterns on
+# their own, so the facts are the ones separate passes over the text would give.
+_INNER_OF = {
+    "url":    ("email", "domain", "ipv4", "cve"),
+    "email":  ("domain", "ipv4", "cve"),
+    "domain": ("ipv4", "cve"),
+}
 
-def extract_from_text(text: str) -> Dict[str, Any]:
-    out = _empty()
-    if not text:
-        return out
+_PATTERNS = {
+    "entities":  ("|".join(f"(?P<{name}>{pat})" for name, pat in _ENTITY_PATTERNS), re.I),
+    **{f"inner_{name}": (pat, re.I) for name, pat in _ENTITY_PATTERNS if name != "url"},
+    "ipv6":      (_IPV6, re.I),
+    "port_line": (r'\b(?:port|open|listening|closed|filtered)[^\n]{0,50}\b(\d{1,5})\b', re.I),
+    "service":   (r'\b(ssh|rdp|ftp|smtp|imap|pop3|http|https|smb|ldap|kerberos|dns|mysql|mssql|postgres|ntp|snmp|telnet)\b', re.I),
+    "userpass":  (r'\b(user(name)?|login)[\s:=]+([^\s:]+)\b.*?\b(pass(word)?)[\s:=]+([^\s]+)\b', re.I),
+    "pair":      (r'\b([A-Za-z0-9._\-]{1,64})[:|/]([^\s]{1,128})\b', 0),  # loose: user:pass or user/pass
+    "filepath":  (r'\b(/[^ \t\n\r\f\v]+|[A-Za-z]:\\[^ \t\n\r\f\v]+)\b', 0),
+    "banner":    (r'\b(Server:|X-Powered-By:|ssh-[0-9.]+|OpenSSH[_/][0-9.]+|nginx/[0-9.]+|Apache/[0-9.]+)\b.*', re.I),
+    "error":     (r'\b(denied|forbidden|unauthorized|timeout|timed out|refused|connection reset|no route|not found|exception|traceback|stack trace)\b', re.I),
+}
+# the same set twice: str for command lines, bytes for scanning mapped files in place
+_STR_RE = {name: _compile(pat, flags) for name, (pat, flags) in _PATTERNS.items()}
+_BYTES_RE = {name: _compile(pat.encode(), flags) for name, (pat, flags) in _PATTERNS.items()}
+
+@dataclass
+class Facts:
+    """
+    One set per kind of fact, so merging is set |= set (no per-item Python loop).
+    Lists only appear in to_dict(), the JSON shape used in payloads and audit records.
+    """
+    ips: Set[str] = field(default_factory=set)
+    ipv6: Set[str] = field(default_factory=set)
+    urls: Set[str] = field(default_factory=set)
+    domains: Set[str] = field(default_factory=set)
+    emails: Set[str] = field(default_factory=set)
+    ports: Set[int] = field(default_factory=set)
+    services: Set[str] = field(default_factory=set)
+    files: Set[str] = field(default_factory=set)
+    banners: Set[str] = field(default_factory=set)
+    cves: Set[str] = field(default_factory=set)
+    usernames: Set[str] = field(default_factory=set)
+    passwords: Set[str] = field(default_factory=set)
+    pairs: Set[str] = field(default_factory=set)
+    errors: Set[str] = field(default_factory=set)
+    indicators: List[str] = field(default_factory=list)
+
+    def merge(self, other: "Facts") -> "Facts":
+        """Fold `other` into self in place (other is left untouched)."""
+        for name in _SET_FIELDS:
+            getattr(self, name).update(getattr(other, name))
+        if other.indicators:
+            self.indicators = list(dict.fromkeys(self.indicators + other.indicators))
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "entities": {
+                "ips": sorted(self.ips), "ipv6": sorted(self.ipv6), "urls": sorted(self.urls),
+                "domains": sorted(self.domains), "emails": sorted(self.emails),
+            },
+            "artifacts": {
+                "ports": sorted(self.ports), "services": sorted(self.services),
+                "files": sorted(self.files), "banners": sorted(self.banners),
+            },
+            "vulns": {"cves": sorted(self.cves)},
+            "creds": {"usernames": sorted(self.usernames), "passwords": sorted(self.passwords), "pairs": sorted(self.pairs)},
+            "errors": sorted(self.errors),
+            "indicators": list(self.indicators),
+        }
+
+_SET_FIELDS = [name for name in Facts.__dataclass_fields__ if name != "indicators"]
+
+def merge_facts(base: Facts, incoming: Facts) -> Facts:
+    return base.merge(incoming)
+
+def _url_host(url: str) -> str:
+    return url.split("://")[-1].split("/")[0].lower()
+
+def _decode_all(spans: List[bytes]) -> List[str]:
+    """Decode a batch of spans in one call; none of the patterns can match a newline."""
+    if not spans:
+        return []
+    return b"\n".join(spans).decode("utf-8", errors="ignore").split("\n")
+
+def _as_is(spans: List[str]) -> List[str]:
+    return spans
+
+def _spans(text, P: Dict[str, Any], pos: int, endpos: int) -> Dict[str, list]:
+    """Regex pass only: raw matched spans per kind, still str or bytes like `text`."""
+    spans: Dict[str, list] = {name: [] for name in _ENTITY_NAMES}
+    buckets = [spans[name] for name in _ENTITY_NAMES]
+    outer = []
+    for m in P["entities"].finditer(text, pos, endpos):
+        kind = _ENTITY_NAMES[m.lastindex - 1]
+        span = m.group()
+        buckets[m.lastindex - 1].append(span)
+        if kind in _INNER_OF:
+            outer.append((kind, span))
+    for kind, span in outer:
+        for inner in _INNER_OF[kind]:
+            spans[inner].extend(P[f"inner_{inner}"].findall(span))
+    spans["ipv6"] = [m.group(0) for m in P["ipv6"].finditer(text, pos, endpos)]
+    spans["port"] = [m.group(1) for m in P["port_line"].finditer(text, pos, endpos)]
+    spans["service"] = [m.group(1) for m in P["service"].finditer(text, pos, endpos)]
+    spans["file"] = [m.group(1) for m in P["filepath"].finditer(text, pos, endpos)]
+    spans["banner"] = [m.group(0) for m in P["banner"].finditer(text, pos, endpos)]
+    spans["error"] = [m.group(0) for m in P["error"].finditer(text, pos, endpos)]
+    userpass = [m.group(3, 6) for m in P["userpass"].finditer(text, pos, endpos)]
+    spans["user"] = [u for u, _ in userpass]
+    spans["pass"] = [p for _, p in userpass]
+    pairs = [m.group(1, 2) for m in P["pair"].finditer(text, pos, endpos)]
+    spans["pair_user"] = [u for u, _ in pairs]
+    spans["pair_pass"] = [p for _, p in pairs]
+    return spans
+
+def _finalize(spans: Dict[str, list], decode_all) -> Facts:
+    """Bucket, decode and normalize the spans of one scan: one decode call per kind, not per token."""
+    out = Facts()
+    ports = list(map(int, spans.pop("port")))  # \d{1,5}; int() takes str or bytes digits
+    found = {kind: decode_all(v) for kind, v in spans.items()}
 
-    ips = RE_IPV4.findall(text)
-    ipv6 = RE_IPV6.findall(text)
-    urls = RE_URL.findall(text)
-    doms = [d for d in RE_DOM.findall(text) if d.lower() not in {u.split("://")[-1].split("/")[0].lower() for u in urls}]
-    emails = RE_EMAIL.findall(text)
-    cves = RE_CVE.findall(text)
+    url_hosts = {_url_host(u) for u in found["url"]}
+    ips = found["ipv4"]
+    urls = found["url"]
+    cves = found["cve"]
 
-    ports = [int(p) for p in RE_PORT_LINE.findall(text) if p.isdigit()]
-    services = [s.lower() for s in RE_SERVICE.findall(text)]
-    files = RE_FILEPATH.findall(text)
-    banners = [m.group(0).strip() for m in RE_BANNER.finditer(text)]
-    errors = [m.group(0).strip() for m in RE_ERROR.finditer(text)]
+    out.ips.update(ips)
+    out.ipv6.update(found["ipv6"])
+    out.urls.update(urls)
+    out.domains.update(d for d in found["domain"] if d.lower() not in url_hosts)
+    out.emails.update(found["email"])
+    out.cves.update(cves)
+    out.ports.update(ports)
+    out.services.update(map(str.lower, found["service"]))
+    out.files.update(found["file"])
+    out.banners.update(map(str.strip, found["banner"]))
+    out.errors.update(map(str.strip, found["error"]))
 
     # credentials
-    for m in RE_USERPASS.finditer(text):
-        out["creds"]["usernames"].append(m.group(3))
-        out["creds"]["passwords"].append(m.group(6))
-        out["creds"]["pairs"].append(f"{m.group(3)}:{m.group(6)}")
-    # very loose pairs (filter obvious garbage)
-    for u, p in RE_PAIR.findall(text):
-        if len(u) <= 2 or len(p) <= 2:  # skip trivial
-            continue
-        out["creds"]["pairs"].append(f"{u}:{p}")
-
-    out["entities"]["ips"] = sorted(set(ips))
-    out["entities"]["ipv6"] = sorted(set(ipv6))
-    out["entities"]["urls"] = sorted(set(urls))
-    out["entities"]["domains"] = sorted(set(doms))
-    out["entities"]["emails"] = sorted(set(emails))
-    out["vulns"]["cves"] = sorted(set(cves))
-    out["artifacts"]["ports"] = sorted(set(ports))
-    out["artifacts"]["services"] = sorted(set(services))
-    out["artifacts"]["files"] = sorted(set(files))
-    _extend_unique(out["artifacts"]["banners"], banners)
-    _extend_unique(out["errors"], errors)
-
-    # high-level indicators (quick glance)
-    if ips: out["indicators"].append(f"ips:{len(ips)}")
-    if urls: out["indicators"].append(f"urls:{len(urls)}")
-    if cves: out["indicators"].append(f"cves:{len(cves)}")
-    if out["creds"]["pairs"]: out["indicators"].append(f"creds:{len(out['creds']['pairs'])}")
-    if ports: out["indicators"].append(f"ports:{len(ports)}")
+    out.usernames.update(found["user"])
+    out.passwords.update(found["pass"])
+    pairs = [f"{u}:{p}" for u, p in zip(found["user"], found["pass"])]
+    # very loose pairs (filter obvious garbage; skip trivial)
+    pairs += [f"{u}:{p}" for u, p in zip(found["pair_user"], found["pair_pass"]) if len(u) > 2 and len(p) > 2]
+    out.pairs.update(pairs)
+
+    # high-level indicators (quick glance; raw hit counts, before dedup)
+    if ips: out.indicators.append(f"ips:{len(ips)}")
+    if urls: out.indicators.append(f"urls:{len(urls)}")
+    if cves: out.indicators.append(f"cves:{len(cves)}")
+    if pairs: out.indicators.append(f"creds:{len(pairs)}")
+    if ports: out.indicators.append(f"ports:{len(ports)}")
 
     return out
 
-def extract_from_file(path: str) -> Dict[str, Any]:
+def _scan(text, P: Dict[str, Any], decode_all, pos: int, endpos: int) -> Facts:
+    """
+    Facts for text[pos:endpos]. `text` is a str (P=_STR_RE, decode_all=_as_is) or any
+    bytes buffer (P=_BYTES_RE, decode_all=_decode_all); only matched
+    spans are decoded.
+    """
+    if pos >= endpos:
+        return Facts()
+    return _finalize(_spans(text, P, pos, endpos), decode_all)
+
+def scan_text(text: str) -> Facts:
+    if not text:
+        return Facts()
+    return _scan(text, _STR_RE, _as_is, 0, len(text))
+
+def extract_from_text(text: str) -> Dict[str, Any]:
+    return scan_text(text).to_dict()
+
+def _concat_facts(head: Facts, tail: Facts) -> Facts:
+    """Facts for two consecutive slices of one text; indicator counts add up instead of repeating."""
+    out = Facts().merge(head).merge(tail)
+    # a URL in one slice hides its host from the other slice's domains too
+    url_hosts = {_url_host(u) for u in out.urls}
+    out.domains = {d for d in out.domains if d.lower() not in url_hosts}
+    counts: Dict[str, int] = {}
+    for ind in head.indicators + tail.indicators:
+        name, n = ind.split(":")
+        counts[name] = counts.get(name, 0) + int(n)
+    out.indicators = [f"{name}:{counts[name]}" for name in ("ips", "urls", "cves", "creds", "ports") if name in counts]
+    return out
+
+# path -> (stat key, offset past the last complete line, blake2b of the bytes before it,
+#          facts for lines before it, facts for the whole file)
+_FILE_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+_FILE_CACHE_MAX = 256
+_READ_BLOCK = 1 << 20
+
+def _prefix_digest(fd: int, n: int) -> bytes:
+    """blake2b of the first n bytes, read in blocks; a file cut shorter meanwhile just hashes differently."""
+    h = hashlib.blake2b(digest_size=16)
+    pos = 0
+    while pos < n:
+        block = os.pread(fd, min(_READ_BLOCK, n - pos), pos)
+        if not block:
+            break
+        h.update(block)
+        pos += len(block)
+    return h.digest()
+
+def scan_file(path: str) -> Facts:
+    """
+    Facts for a file, cached by (inode, mtime, size). Unchanged files are free;
+    files that only grew (tools appending results) are scanned from the last
+    complete line onward and merged into the cached facts. Growth only counts
+    as an append when the bytes already scanned hash the same: a tool that
+    truncates and rewrites its output file in place keeps the inode.
+    The returned Facts are shared with the cache: merge them, don't mutate them.
+    """
     try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            text = f.read()
-        return extract_from_text(text)
+        st = os.stat(path)
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        hit = _FILE_CACHE.get(path)
+        if hit and hit[0] == key:
+            _FILE_CACHE.move_to_end(path)
+            return hit[4]
+
+        offset, done, digest = 0, Facts(), hashlib.blake2b(digest_size=16)
+        grown = hit and hit[0][0] == st.st_ino and st.st_size > hit[0][2]
+
+        # bounded preads, not a mapping: the producing tool may truncate the file while
+        # it is scanned, and touching a mapped page past the new end raises SIGBUS
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            size = os.fstat(fd).st_size
+            if grown and _prefix_digest(fd, hit[1]) == hit[2].digest():
+                offset, done, digest = hit[1], hit[3], hit[2].copy()
+            buf = os.pread(fd, size - offset, offset) if size > offset else b""
+        finally:
+            os.close(fd)
+        end = len(buf)
+        cut = buf.rfind(b"\n") + 1
+        digest.update(memoryview(buf)[:cut])
+        if cut:
+            done = _concat_facts(done, _scan(buf, _BYTES_RE, _decode_all, 0, cut))
+        facts = done
+        if cut < end:  # unterminated last line: include it now, rescan it once it completes
+            facts = _concat_facts(done, _scan(buf, _BYTES_RE, _decode_all, cut, end))
+        cut += offset
+
+        _FILE_CACHE[path] = (key, cut, digest, done, facts)
+        _FILE_CACHE.move_to_end(path)
+        if len(_FILE_CACHE) > _FILE_CACHE_MAX:
+            _FILE_CACHE.popitem(last=False)
+        return facts
     except Exception as e:
-        return {"indicators":[f"extract_error:{path}:{e}"]}
+        return Facts(indicators=[f"extract_error:{path}:{e}"])
+
+def extract_from_file(path: str) -> Dict[str, Any]:
+    return scan_file(path).to_dict()
@@ -3,32 +3,61 @@
 from __future__ import annotations
 
 import os
-import json
-import re
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List
 
+import orjson
 import requests
 
-from ..utils.prompt import build_prompt
+from ..utils.jsonscan import extract_json
+from ..utils.prompt import build_prompt_parts
 from ..utils.redact import redact
 
 ANTHROPIC_URL = "https://api.anthropic.com/v1/messages"
 API_VERSION = os.environ.get("ANTHROPIC_VERSION", "2023-06-01")
 HTTP_TIMEOUT = float(os.environ.get("AIC_ANTHROPIC_TIMEOUT", "60"))
 
-
-def _extract_json(s: str) -> dict | None:
-    """Grab the largest {...} block from the text and parse it."""
-    if not s:
-        return None
-    first = s.find("{")
-    last = s.rfind("}")
-    if first == -1 or last == -1 or last <= first:
-        return None
-    try:
-        return json.loads(s[first : last + 1])
-    except Exception:
-        return None
+# One pooled session per process: keep-alive reuses the TCP+TLS connection
+# to api.anthropic.com instead of handshaking on every event.
+_SESSION = requests.Session()
+_SESSION.headers.update({"anthropic-version": API_VERSION, "content-type": "application/json"})
+
+# Forcing this tool makes the model return the plan as structured arguments
+# (already-valid JSON) instead of prose we have to dig an object out of.
+_PLAN_TOOL = {
+    "name": "emit_plan",
+    "description": "Report the ranked next steps, notes and escalation paths for the operator.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "next_actions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "cmd": {"type": "string"},
+                        "reason": {"type": "string"},
+                        "noise": {"type": "string", "enum": ["low", "med", "high"]},
+                        "safety": {"type": "string", "enum": ["read-only", "intrusive", "exploit"]},
+                    },
+                    "required": ["cmd", "reason"],
+                },
+            },
+            "notes": {"type": "array", "items": {"type": "string"}},
+            "escalation_paths": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["next_actions", "notes", "escalation_paths"],
+    },
+}
+
+
+def _iter_sse(r: requests.Response) -> Iterator[dict]:
+    """Decoded `data:` payloads of a server-sent-events response."""
+    for line in r.iter_lines():
+        if line.startswith(b"data:"):
+            try:
+                yield orjson.loads(line[5:])
+            except orjson.JSONDecodeError:
+                continue
 
 
 def _shape_plan(obj: dict) -> dict:
@@ -68,6 +97,9 @@ def _shape_plan(obj: dict) -> dict:
     return plan
 
 
+_BRACKETS = str.maketrans("[]", "()")
+
+
 def _sanitize_for_markup(s: str) -> str:
     """
     Make free-form text safe for Rich markup without changing the UI layer.
@@ -76,9 +108,19 @@ def _sanitize_for_markup(s: str) -> str:
     """
     if not s:
         return ""
-    s = re.sub(r"```.*?```", "", s, flags=re.S)
-    s = s.replace("[", "(").replace("]", ")")
-    return s
+    parts: List[str] = []
+    pos = 0
+    while True:
+        i = s.find("```", pos)
+        j = s.find("```", i + 3) if i != -1 else -1
+        if j == -1:  # no (complete) fence left; an unpaired ``` stays, as with ```.*?```
+            break
+        parts.append(s[pos:i])
+        pos = j + 3
+    if pos:
+        parts.append(s[pos:])
+        s = "".join(parts)
+    return s.translate(_BRACKETS)
 
 
 def plan_with_anthropic(model: str, payload: Dict[str, Any], allow_cloud: bool = False) -> Dict[str, Any]:
@@ -91,43 +133,84 @@ def plan_with_anthropic(model: str, payload: Dict[str, Any], allow_cloud: bool =
     if not model:
         return {"next_actions": [], "notes": ["anthropic_error:empty_model"], "escalation_paths": []}
 
-    prompt = build_prompt(redact(payload, allow_cloud=allow_cloud))
-    headers = {
-        "x-api-key": key,
-        "anthropic-version": API_VERSION,
-        "content-type": "application/json",
-    }
+    static, dynamic = build_prompt_parts(redact(payload, allow_cloud=allow_cloud))
+    headers = {"x-api-key": key}
     body = {
         "model": model,
         "max_tokens": 800,
         "temperature": 0.2,
-        "messages": [{"role": "user", "content": prompt}],
+        # the instructions block is byte-identical every call: mark it so the
+        # server reuses its prefill (together with the tool definition before it)
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": static, "cache_control": {"type": "ephemeral"}},
+                    {"type": "text", "text": dynamic},
+                ],
+            }
+        ],
+        "tools": [_PLAN_TOOL],
+        "tool_choice": {"type": "tool", "name": _PLAN_TOOL["name"]},
+        "stream": True,
     }
 
     try:
-        r = requests.post(ANTHROPIC_URL, headers=headers, json=body, timeout=HTTP_TIMEOUT)
+        r = _SESSION.post(ANTHROPIC_URL, headers=headers, json=body, timeout=HTTP_TIMEOUT, stream=True)
     except Exception as e:
         return {"next_actions": [], "notes": [f"anthropic_request_error:{e}"], "escalation_paths": []}
 
-    if r.status_code >= 400:
-        return {
-            "next_actions": [],
-            "notes": [f"anthropic_error:{r.status_code}", _sanitize_for_markup(r.text[:200])],
-            "escalation_paths": [],
-        }
-
-    try:
-        data = r.json()
-        # content is a list of blocks; concatenate text blocks
-        text = "".join(
-            block.get("text", "")
-            for block in (data.get("content") or [])
-            if isinstance(block, dict) and block.get("type") == "text"
-        )
-    except Exception as e:
-        return {"next_actions": [], "notes": [f"anthropic_bad_json:{e}"], "escalation_paths": []}
-
-    obj = _extract_json(text)
+    with r:
+        if r.status_code >= 400:
+            return {
+                "next_actions": [],
+                "notes": [f"anthropic_error:{r.status_code}", _sanitize_for_markup(r.text[:200])],
+                "escalation_paths": [],
+            }
+
+        # Forced tool use streams the plan as input_json_delta fragments; the block's
+        # stop event means the arguments are complete. Text deltas are the fallback
+        # for models that answer in prose: whenever a chunk closes a brace, try to
+        # slice out the plan. Parse as soon as possible, but keep reading to
+        # message_stop so the pooled keep-alive connection can be reused.
+        parts: List[str] = []
+        tool_parts: List[str] = []
+        tool_index = None
+        obj = None
+        try:
+            for ev in _iter_sse(r):
+                kind = ev.get("type")
+                if kind == "error":
+                    err = (ev.get("error") or {}).get("type", "unknown")
+                    return {"next_actions": [], "notes": [f"anthropic_error:{err}"], "escalation_paths": []}
+                if kind == "message_stop":
+                    break
+                if kind == "content_block_start" and (ev.get("content_block") or {}).get("type") == "tool_use":
+                    tool_index = ev.get("index")
+                elif kind == "content_block_stop" and tool_index is not None and ev.get("index") == tool_index:
+                    try:
+                        tool_obj = orjson.loads("".join(tool_parts))
+                    except orjson.JSONDecodeError:
+                        tool_obj = None
+                    if isinstance(tool_obj, dict):
+                        obj = tool_obj
+                elif kind == "content_block_delta":
+                    delta = ev.get("delta") or {}
+                    if delta.get("type") == "input_json_delta":
+                        tool_parts.append(delta.get("partial_json", ""))
+                    elif delta.get("type") == "text_delta":
+                        chunk = delta.get("text", "")
+                        parts.append(chunk)
+                        if obj is None and "}" in chunk:
+                            obj = extract_json("".join(parts), partial=True) or None
+        except Exception as e:
+            if not parts and not tool_parts:
+                return {"next_actions": [], "notes": [f"anthropic_bad_json:{e}"], "escalation_paths": []}
+            # stream cut off mid-way: parse whatever text made it through
+
+    text = "".join(parts) or "".join(tool_parts)
+    if obj is None:
+        obj = extract_json(text)
     if not obj:
         # Return a safe hint in notes, let the agent’s heuristics fill suggestions.
         return {
@@ -2,12 +2,15 @@
 from __future__ import annotations
 
 import os
-import json
 import time
 import subprocess
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+
+from ..utils.jsonscan import extract_json
 
 
 # ---- Endpoint & timeouts ----------------------------------------------------
@@ -28,6 +31,17 @@ OLLAMA_URL = _normalize_base(
 # Local models can be slow; make this generous (override with AIC_OLLAMA_TIMEOUT)
 HTTP_TIMEOUT = float(os.environ.get("AIC_OLLAMA_TIMEOUT", "120.0"))
 
+# One pooled session per process: /api/version, /api/tags and /api/generate
+# share kept-alive connections; pool sized for the agent's concurrent calls.
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+# Installed models change rarely; reuse /api/tags for this long (AIC_OLLAMA_TAGS_TTL, seconds)
+TAGS_TTL = float(os.environ.get("AIC_OLLAMA_TAGS_TTL", "60"))
+_TAGS_CACHE: Dict[str, Tuple[float, List[str]]] = {}  # OLLAMA_URL -> (fetched_at, names)
+
 
 # ---- Small helpers ----------------------------------------------------------
 
@@ -38,18 +52,26 @@ def _clean_tag(tag: Optional[str]) -> str:
     return tag.strip().strip('"').strip("'")
 
 
+_BRACKETS = str.maketrans("[]", "()")
+
+
 def _sanitize(s: Any) -> str:
     """Avoid Rich/Textual markup collisions and keep lines tidy."""
-    s = str(s)
-    return s.replace("[", "(").replace("]", ")").strip()
+    return str(s).translate(_BRACKETS).strip()
 
 
 def _http_get(path: str) -> requests.Response:
-    return requests.get(f"{OLLAMA_URL}{path}", timeout=HTTP_TIMEOUT)
+    return _SESSION.get(f"{OLLAMA_URL}{path}", timeout=HTTP_TIMEOUT)
 
 
 def _http_post(path: str, data: dict) -> requests.Response:
-    return requests.post(f"{OLLAMA_URL}{path}", json=data, timeout=HTTP_TIMEOUT)
+    return _SESSION.post(
+        f"{OLLAMA_URL}{path}",
+        data=orjson.dumps(data),
+        headers={"Content-Type": "application/json"},
+        timeout=HTTP_TIMEOUT,
+        stream=bool(data.get("stream")),
+    )
 
 
 def _try_start_server() -> bool:
@@ -85,15 +107,21 @@ def _ensure_server() -> Optional[str]:
 
 
 def _installed_models() -> List[str]:
+    hit = _TAGS_CACHE.get(OLLAMA_URL)
+    if hit and time.monotonic() - hit[0] < TAGS_TTL:
+        return hit[1]
     try:
         r = _http_get("/api/tags")
         if not r.ok:
             return []
-        data = r.json()
+        data = orjson.loads(r.content)
         # schema: {"models":[{"name":"llama3.2:1b", ...}, ...]}
-        return [m.get("name", "") for m in data.get("models", []) if m.get("name")]
+        names = [m.get("name", "") for m in data.get("models", []) if m.get("name")]
     except Exception:
         return []
+    # only successful listings are cached; a failed one is retried next call
+    _TAGS_CACHE[OLLAMA_URL] = (time.monotonic(), names)
+    return names
 
 
 def _pull_model(tag: str) -> Optional[str]:
@@ -103,6 +131,7 @@ def _pull_model(tag: str) -> Optional[str]:
     """
     if not tag:
         return "ollama_pull_failed:empty_tag"
+    _TAGS_CACHE.pop(OLLAMA_URL, None)  # the installed set is about to change
 
     try:
         # No quotes around tag in argv – quoting breaks the name (causes 400).
@@ -122,23 +151,6 @@ def _pull_model(tag: str) -> Optional[str]:
         return f"ollama_pull_failed:{(e.stdout or '').strip() or e}"
 
 
-def _extract_json(s: str) -> Optional[dict]:
-    """
-    Try to extract a JSON object from an LLM response (which may include prose).
-    We take the largest {...} block and parse it.
-    """
-    if not s:
-        return None
-    first = s.find("{")
-    last = s.rfind("}")
-    if first == -1 or last == -1 or last <= first:
-        return None
-    try:
-        return json.loads(s[first : last + 1])
-    except Exception:
-        return None
-
-
 def _shape_plan(obj: dict) -> dict:
     """
     Normalize a model's JSON into Sidecar's plan shape.
@@ -185,6 +197,56 @@ def _shape_plan(obj: dict) -> dict:
     return plan
 
 
+_PROMPT_HEAD = """You are a penetration testing copilot. Based ONLY on the context below,
+propose the next shell commands to run. Be concise and pragmatic.
+
+Output STRICT JSON with the following shape and NOTHING else:
+
+{
+  "next_actions": [{"cmd": "...", "reason": "...", "noise": "low|med|high", "safety": "read-only|intrusive|exploit"}],
+  "notes": ["..."],
+  "escalation_paths": ["..."]
+}
+
+Guidelines:
+- Prefer low-noise, read-only enumeration first.
+- Use context from previous commands, artifacts, and retrieved notes.
+- Do not invent targets or credentials; rely on provided facts.
+- If no stdout/stderr was captured, suggest re-running via the capture wrapper.
+- Keep 'cmd' runnable as-is in a typical Kali shell.
+"""
+
+# character budget for the facts block of the prompt
+_FACTS_BUDGET = 1600
+
+
+def _trim_facts(x: Any, cap: int, text_cap: int) -> Any:
+    """Drop empty containers, keep at most `cap` items per list and `text_cap` chars per string."""
+    if isinstance(x, dict):
+        out = {k: _trim_facts(v, cap, text_cap) for k, v in x.items()}
+        return {k: v for k, v in out.items() if v not in ({}, [], "", None)}
+    if isinstance(x, list):
+        return [_trim_facts(v, cap, text_cap) for v in x[:cap]]
+    if isinstance(x, str):
+        return x[:text_cap]
+    return x
+
+
+def _facts_json(facts: Any) -> str:
+    """
+    Facts as JSON within _FACTS_BUDGET. Lists are shortened until it fits rather
+    than cutting the serialized text, so the model always sees valid JSON.
+    """
+    cap, text_cap = 64, 200
+    blob = orjson.dumps(_trim_facts(facts, cap, text_cap))
+    while len(blob) > _FACTS_BUDGET and cap > 1:
+        cap //= 2
+        blob = orjson.dumps(_trim_facts(facts, cap, text_cap))
+    if len(blob) > _FACTS_BUDGET:
+        blob = orjson.dumps(_trim_facts(facts, 1, 40))
+    return blob.decode()
+
+
 def _build_prompt(payload: Dict[str, Any]) -> str:
     """
     Build a compact instruction prompt for small local models.
@@ -214,50 +276,34 @@ def _build_prompt(payload: Dict[str, Any]) -> str:
         except Exception:
             continue
 
-    instruction = f"""
-You are a penetration testing copilot. Based ONLY on the context below,
-propose the next shell commands to run. Be concise and pragmatic.
-
-Output STRICT JSON with the following shape and NOTHING else:
-
-{{
-  "next_actions": [{{"cmd": "...", "reason": "...", "noise": "low|med|high", "safety": "read-only|intrusive|exploit"}}],
-  "notes": ["..."],
-  "escalation_paths": ["..."]
-}}
-
-Guidelines:
-- Prefer low-noise, read-only enumeration first.
-- Use context from previous commands, artifacts, and retrieved notes.
-- Do not invent targets or credentials; rely on provided facts.
-- If no stdout/stderr was captured, suggest re-running via the capture wrapper.
-- Keep 'cmd' runnable as-is in a typical Kali shell.
-
-Context:
-- cwd: {cwd}
-- last_cmd: {last_cmd}
-- last_exit: {exit_code}
-
-Facts (parsed):
-{json.dumps(facts)[:1600]}
-
-Recent:
-{os.linesep.join(recent_lines)}
-
-Methodology notes:
-{os.linesep.join(snippet_lines)}
-"""
-    return instruction.strip()
+    return "\n".join(
+        [
+            _PROMPT_HEAD,
+            "Context:",
+            f"- cwd: {cwd}",
+            f"- last_cmd: {last_cmd}",
+            f"- last_exit: {exit_code}",
+            "",
+            "Facts (parsed):",
+            _facts_json(facts),
+            "",
+            "Recent:",
+            os.linesep.join(recent_lines),
+            "",
+            "Methodology notes:",
+            os.linesep.join(snippet_lines),
+        ]
+    ).strip()
 
 
 def _generate_once(model: str, prompt: str) -> requests.Response:
-    """Single /api/generate call with stream disabled."""
+    """Single streaming /api/generate call; the body is read by _read_response."""
     return _http_post(
         "/api/generate",
         {
             "model": model,           # IMPORTANT: unquoted clean tag
             "prompt": prompt,
-            "stream": False,
+            "stream": True,
             # optional generation knobs:
             "options": {
                 "temperature": 0.2,
@@ -268,6 +314,31 @@ def _generate_once(model: str, prompt: str) -> requests.Response:
     )
 
 
+def _read_response(r: requests.Response) -> str:
+    """
+    Concatenate the streamed NDJSON `response` fragments. Stops as soon as they
+    hold a complete top-level plan object (one with next_actions), so trailing
+    chatter isn't waited for.
+    """
+    buf: List[str] = []
+    with r:
+        for line in r.iter_lines():
+            if not line:
+                continue
+            obj = orjson.loads(line)
+            if obj.get("error"):
+                raise ValueError(obj["error"])
+            piece = obj.get("response", "") or ""
+            buf.append(piece)
+            if obj.get("done"):
+                break
+            if "}" in piece:
+                plan = extract_json("".join(buf), partial=True)
+                if plan is not None and "next_actions" in plan:
+                    break
+    return "".join(buf)
+
+
 def plan_with_ollama(model: str, payload: Dict[str, Any], allow_cloud: bool = False) -> Dict[str, Any]:
     """
     Generate a Sidecar plan using a local Ollama model.
@@ -308,7 +379,7 @@ def plan_with_ollama(model: str, payload: Dict[str, Any], allow_cloud: bool = Fa
         err_text = ""
         try:
             err_json = r.json()
-            err_text = json.dumps(err_json)
+            err_text = orjson.dumps(err_json).decode()
         except Exception:
             err_text = r.text
 
@@ -327,7 +398,7 @@ def plan_with_ollama(model: str, payload: Dict[str, Any], allow_cloud: bool = Fa
             if not r.ok:
                 try:
                     err_json = r.json()
-                    err_text = json.dumps(err_json)
+                    err_text = orjson.dumps(err_json).decode()
                 except Exception:
                     err_text = r.text
                 notes.append(f"ollama_http_error:{r.status_code}")
@@ -340,13 +411,12 @@ def plan_with_ollama(model: str, payload: Dict[str, Any], allow_cloud: bool = Fa
 
     # Parse response
     try:
-        data = r.json()
-        raw = data.get("response", "") or ""
+        raw = _read_response(r)
     except Exception as e:
         notes.append(f"ollama_bad_json:{e}")
         return {"next_actions": [], "notes": notes, "escalation_paths": []}
 
-    obj = _extract_json(raw)
+    obj = extract_json(raw)
     if not obj:
         # Some tiny models drift—fallback: provide a hint and let agent heuristics kick in.
         notes.append("parse_error:response_not_json")
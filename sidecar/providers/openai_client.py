@@ -1,36 +1,47 @@
 # sidecar/sidecar/providers/openai_client.py
 from __future__ import annotations
 
-import json
 import os
-from typing import Any, Dict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict
 
-from openai import OpenAI
+import orjson
 from ..utils.redact import redact
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+
+@lru_cache(maxsize=4)
+def _client(api_key: str) -> OpenAI:
+    """One client per key: its pooled HTTP connections stay alive across events."""
+    from openai import OpenAI  # heavy SDK import, only paid when this provider is used
+    return OpenAI(api_key=api_key)
+
 
 def _want_responses_api(model: str) -> bool:
     m = (model or "").lower()
     return m.startswith("gpt-5") or m.startswith("o5")
 
 
-def _system_prompt() -> str:
-    return (
-        "You are sidecar, an AI copilot for pentesting/CTFs. "
-        "Given the terminal context (recent events, last command, parsed facts), "
-        "propose actionable next steps. "
-        "Respond ONLY as strict JSON matching this schema:\n"
-        "{"
-        "\"next_actions\":[{\"cmd\":\"\",\"reason\":\"\",\"noise\":\"low|med|high\",\"safety\":\"read-only|intrusive|exploit\"}],"
-        "\"notes\":[\"...\"],"
-        "\"escalation_paths\":[\"...\"]"
-        "}\n"
-        "Be concise and avoid repeating identical suggestions."
-    )
-
-
-def _user_payload(payload: Dict[str, Any]) -> str:
-    slim = {
+# Constant: built once at import instead of per plan.
+_SYS_PROMPT = (
+    "You are sidecar, an AI copilot for pentesting/CTFs. "
+    "Given the terminal context (recent events, last command, parsed facts), "
+    "propose actionable next steps. "
+    "Respond ONLY as strict JSON matching this schema:\n"
+    "{"
+    "\"next_actions\":[{\"cmd\":\"\",\"reason\":\"\",\"noise\":\"low|med|high\",\"safety\":\"read-only|intrusive|exploit\"}],"
+    "\"notes\":[\"...\"],"
+    "\"escalation_paths\":[\"...\"]"
+    "}\n"
+    "Be concise and avoid repeating identical suggestions."
+)
+
+
+def _slim(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Only the fields the model sees; redaction never has to walk the rest."""
+    return {
         "profile": payload.get("profile"),
         "last_cmd": payload.get("last_cmd"),
         "cwd": payload.get("cwd"),
@@ -39,12 +50,25 @@ def _user_payload(payload: Dict[str, Any]) -> str:
         "recent_events": payload.get("recent_events", [])[-8:],
         "retrieved_snippets": payload.get("retrieved_snippets", [])[:4],
     }
-    return json.dumps(slim, ensure_ascii=False)
+
+
+@lru_cache(maxsize=64)
+def _redacted_event(blob: bytes) -> Any:
+    # consecutive plans share most of their recent-events window; redact each event once
+    return redact(orjson.loads(blob))
+
+
+def _redact_slim(slim: Dict[str, Any], allow_cloud: bool) -> Dict[str, Any]:
+    if allow_cloud:
+        return slim
+    safe = redact({k: v for k, v in slim.items() if k != "recent_events"})
+    events = [_redacted_event(orjson.dumps(e)) for e in slim["recent_events"] or []]
+    return {k: events if k == "recent_events" else safe[k] for k in slim}
 
 
 def _coerce_json(text: str) -> Dict[str, Any]:
     try:
-        return json.loads(text)
+        return orjson.loads(text)
     except Exception:
         return {"next_actions": [], "notes": [f"openai_error:could_not_parse_json: {text[:180]}"], "escalation_paths": []}
 
@@ -87,11 +111,11 @@ def plan_with_openai(model: str, payload: Dict[str, Any], allow_cloud: bool = Fa
         return _fallback_plan("openai_error:missing_api_key")
 
     # Redact unless allow_cloud given
-    safe_payload = redact(payload, allow_cloud=allow_cloud)
+    safe_payload = _redact_slim(_slim(payload), allow_cloud)
 
-    client = OpenAI(api_key=api_key)
-    sys_prompt = _system_prompt()
-    user_blob = _user_payload(safe_payload)
+    client = _client(api_key)
+    sys_prompt = _SYS_PROMPT
+    user_blob = orjson.dumps(safe_payload).decode()
 
     models_to_try = [model]
     # Allow a comma-separated override list, otherwise use a sensible default chain
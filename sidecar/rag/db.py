@@ -1,6 +1,16 @@
-import os, sqlite3, pathlib, pickle
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import io, os, sqlite3, pathlib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.preprocessing import normalize
+
+# Stateless: the hashing trick needs no fitted vocabulary, so only the idf weights
+# (np.savez) and the doc matrix (save_npz) are persisted -- no pickles.
+_VEC = HashingVectorizer(n_features=2**18, alternate_sign=False, norm=None)
+_LEGACY_KEYS = ("tfidf_vec", "tfidf_mat", "tfidf_ids")  # pickled TfidfVectorizer state
+
+def _to_blob(save, *args, **kw) -> bytes:
+    buf = io.BytesIO(); save(buf, *args, **kw); return buf.getvalue()
 
 class SimpleIndex:
     def __init__(self, db_path: str):
@@ -10,31 +20,61 @@ class SimpleIndex:
         self._conn.execute("CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, title TEXT, text TEXT, tags TEXT)")
         self._conn.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v BLOB)")
         self._conn.commit()
+        self._cache = None  # (data_version, idf, mat, [(id,title,tags)], {(q,k): results}) -- decoded once, not per query
     def upsert_docs(self, docs):
         cur = self._conn.cursor()
         cur.execute("DELETE FROM docs")
         cur.executemany("INSERT INTO docs (title,text,tags) VALUES (?,?,?)", docs)
-        self._conn.commit(); self._rebuild_tfidf()
+        self._conn.commit(); self._cache = None; self._rebuild_tfidf()
     def _rebuild_tfidf(self):
         cur = self._conn.cursor()
-        rows = list(cur.execute("SELECT id, text FROM docs ORDER BY id"))
-        ids = [r[0] for r in rows]; texts = [r[1] for r in rows] or [""]
-        vec = TfidfVectorizer(max_features=20000).fit(texts)
-        mat = vec.transform(texts)
-        for k,v in (("tfidf_vec",vec),("tfidf_mat",mat),("tfidf_ids",ids)):
-            cur.execute("INSERT OR REPLACE INTO meta (k,v) VALUES (?,?)", (k, pickle.dumps(v)))
-        self._conn.commit()
+        texts = [r[0] for r in cur.execute("SELECT text FROM docs ORDER BY id")] or [""]
+        tfidf = TfidfTransformer()
+        mat = tfidf.fit_transform(_VEC.transform(texts)).tocsr().astype(np.float32)
+        # only the columns some doc uses; terms outside the fitted vocabulary get idf 0,
+        # as TfidfVectorizer drops them from the query
+        cols = np.unique(mat.indices)
+        idf = _to_blob(np.savez, cols=cols, idf=tfidf.idf_[cols].astype(np.float32))
+        blobs = (("tfidf_idf", idf), ("tfidf_csr", _to_blob(sparse.save_npz, mat, compressed=False)))
+        cur.executemany("INSERT OR REPLACE INTO meta (k,v) VALUES (?,?)", blobs)
+        cur.executemany("DELETE FROM meta WHERE k=?", [(k,) for k in _LEGACY_KEYS])
+        self._conn.commit(); self._cache = None
+    def _load(self):
+        # data_version moves when another connection (e.g. a separate ingest run) commits
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._cache is None or self._cache[0] != version:
+            cur = self._conn.cursor()
+            rows = list(cur.execute("SELECT id,title,tags FROM docs ORDER BY id"))
+            idf = mat = None
+            if rows:
+                meta = dict(cur.execute("SELECT k,v FROM meta WHERE k IN ('tfidf_idf','tfidf_csr')"))
+                if len(meta) < 2:  # index written by the pickled-vocabulary version: rebuild once
+                    self._rebuild_tfidf(); return self._load()
+                with np.load(io.BytesIO(meta["tfidf_idf"])) as z:
+                    idf = np.zeros(_VEC.n_features, dtype=np.float32); idf[z["cols"]] = z["idf"]
+                mat = sparse.load_npz(io.BytesIO(meta["tfidf_csr"]))
+            self._cache = (version, idf, mat, rows, {})
+        return self._cache[1:]
     def query(self, q: str, k: int = 4):
-        cur = self._conn.cursor()
-        rows = list(cur.execute("SELECT id,title,text,tags FROM docs ORDER BY id"))
+        idf, mat, rows, seen = self._load()
         if not rows: return []
-        vec = pickle.loads(cur.execute("SELECT v FROM meta WHERE k='tfidf_vec'").fetchone()[0])
-        mat = pickle.loads(cur.execute("SELECT v FROM meta WHERE k='tfidf_mat'").fetchone()[0])
-        qv = vec.transform([q])
-        sims = cosine_similarity(qv, mat)[0]
-        order = sims.argsort()[::-1][:k]
+        hit = seen.get((q, k))
+        if hit is not None: return [dict(r) for r in hit]
+        qv = _VEC.transform([q]); qv.data *= idf[qv.indices]; qv = normalize(qv)
+        # rows and query are L2-normalized, so the dot product is the cosine
+        sims = (mat @ qv.T).toarray().ravel()
+        if k < len(sims):  # O(N) selection, then sort just the k winners
+            top = np.argpartition(-sims, k - 1)[:k]
+            order = top[np.argsort(-sims[top], kind="stable")]
+        else:
+            order = np.argsort(-sims, kind="stable")
+        # only the top-k texts leave SQLite
+        top = [rows[idx][0] for idx in order]
+        texts = dict(self._conn.execute(f"SELECT id,text FROM docs WHERE id IN ({','.join('?' * len(top))})", top))
         out = []
         for idx in order:
-            doc_id, title, text, tags = rows[idx]
-            out.append({"id": doc_id, "title": title, "text": text[:1200], "tags": tags, "score": float(sims[idx])})
-        return out
+            doc_id, title, tags = rows[idx]
+            out.append({"id": doc_id, "title": title, "text": (texts.get(doc_id) or "")[:1200], "tags": tags, "score": float(sims[idx])})
+        if len(seen) >= 128: seen.clear()
+        seen[(q, k)] = out  # same data_version, same answer
+        return [dict(r) for r in out]
@@ -1,17 +1,16 @@
-from bs4 import BeautifulSoup
 import json, os, sys
 from .db import SimpleIndex
+from .retriever import _HtmlBlocks
 
 def split_html(path: str):
-    html = open(path, "r", encoding="utf-8", errors="ignore").read()
-    soup = BeautifulSoup(html, "lxml")
+    # streamed: no DOM for multi-MB exports, only the section text is held
     docs = []; sections = []; current = {"title":"Root","text":[]}
-    for el in soup.body.descendants:
-        if getattr(el, "name", None) in ("h1","h2"):
+    for name, strings in _HtmlBlocks(path, ("h1","h2","p","pre","code","li"), body_only=True):
+        if name in ("h1","h2"):
             if current["text"]: sections.append(current)
-            current = {"title": el.get_text(strip=True), "text": []}
-        elif getattr(el, "name", None) in ("p","pre","code","li"):
-            current["text"].append(el.get_text(" ", strip=True))
+            current = {"title": "".join(strings), "text": []}
+        else:
+            current["text"].append(" ".join(strings))
     if current["text"]: sections.append(current)
     for sec in sections:
         title = sec["title"] or "Untitled"
@@ -4,10 +4,14 @@ from __future__ import annotations
 import hashlib
 import os
 import sqlite3
+from collections import deque
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Iterable, Iterator, List, Tuple
 
-from bs4 import BeautifulSoup
+from lxml import etree
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 
 def _db_path() -> str:
@@ -21,6 +25,8 @@ def _conn() -> sqlite3.Connection:
     con.row_factory = sqlite3.Row
     con.execute("PRAGMA journal_mode=WAL;")
     con.execute("PRAGMA synchronous=NORMAL;")
+    con.execute("PRAGMA temp_store=MEMORY;")
+    con.execute("PRAGMA cache_size=-20000;")
     return con
 
 
@@ -35,47 +41,171 @@ def _init_db(con: sqlite3.Connection) -> None:
         );
         """
     )
-    # FTS table (no UPSERT support)
-    con.execute(
-        """
-        CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts
-        USING fts5(text, title, tags);
-        """
-    )
+    # External-content FTS: the index reads title/text/tags from `chunks` itself,
+    # so the text isn't stored twice and is (re)built in one 'rebuild' pass.
+    row = con.execute("SELECT sql FROM sqlite_master WHERE name='chunks_fts';").fetchone()
+    if row is not None and "content=" not in row[0]:
+        # older self-contained FTS table (a full copy of every chunk): replace it
+        con.execute("DROP TABLE chunks_fts;")
+        row = None
+    if row is None:
+        con.execute(
+            """
+            CREATE VIRTUAL TABLE chunks_fts
+            USING fts5(text, title, tags, content='chunks', content_rowid='rowid');
+            """
+        )
+        con.execute("INSERT INTO chunks_fts(chunks_fts) VALUES('rebuild');")
+        con.commit()
+
+
+# PRAGMA user_version from which every chunk id is a blake2b digest (sha1 before)
+_BLAKE2_IDS = 1
+
+
+def _chunk_id(path: str, i: int, title: str) -> str:
+    return hashlib.blake2b(f"{path}:{i}:{title}".encode("utf-8"), digest_size=20).hexdigest()
+
+
+def _has_legacy_ids(con: sqlite3.Connection) -> bool:
+    """
+    True while the index may still hold sha1 ids from an older ingest; a fresh DB never does.
+    Both kinds of id are 40 hex chars, so an older index can't tell when the last sha1 row
+    is gone: it keeps the per-file legacy delete for good (a few primary-key misses).
+    """
+    if con.execute("PRAGMA user_version;").fetchone()[0] >= _BLAKE2_IDS:
+        return False
+    if con.execute("SELECT 1 FROM chunks LIMIT 1;").fetchone() is None:
+        con.execute(f"PRAGMA user_version={_BLAKE2_IDS};")
+        return False
+    return True
 
 
-def _upsert_chunk(con: sqlite3.Connection, cid: str, title: str, text: str, tags_csv: str) -> None:
+def _upsert_chunks(con: sqlite3.Connection, rows: List[Tuple[str, str, str, str]], stale: Iterable[str] = ()) -> None:
     """
+    rows: (id, title, text, tags_csv), written in one transaction.
+    0) Drop the `stale` ids (same chunks under their legacy ids).
     1) Upsert into the base table (supported).
-    2) Mirror into the FTS table using INSERT OR REPLACE (supported by FTS5).
+    2) Rebuild the external-content FTS index from `chunks` in one pass.
     """
     cur = con.cursor()
-    cur.execute(
-        """
-        INSERT INTO chunks(id,title,text,tags)
-        VALUES(?,?,?,?)
-        ON CONFLICT(id) DO UPDATE SET
-          title=excluded.title,
-          text =excluded.text,
-          tags =excluded.tags;
-        """,
-        (cid, title, text, tags_csv),
-    )
-    # Get the current rowid and refresh the FTS entry.
-    rowid = cur.execute("SELECT rowid FROM chunks WHERE id=?", (cid,)).fetchone()[0]
-    cur.execute(
-        "INSERT OR REPLACE INTO chunks_fts(rowid, text, title, tags) VALUES (?, ?, ?, ?);",
-        (rowid, text, title, tags_csv),
-    )
+    cur.execute("BEGIN IMMEDIATE;")
+    try:
+        cur.executemany("DELETE FROM chunks WHERE id=?;", [(cid,) for cid in stale])
+        cur.executemany(
+            """
+            INSERT INTO chunks(id,title,text,tags)
+            VALUES(?,?,?,?)
+            ON CONFLICT(id) DO UPDATE SET
+              title=excluded.title,
+              text =excluded.text,
+              tags =excluded.tags;
+            """,
+            rows,
+        )
+        cur.execute("INSERT INTO chunks_fts(chunks_fts) VALUES('rebuild');")
+    except BaseException:
+        con.rollback()
+        raise
+    con.commit()
 
 
 def _norm(s: str) -> str:
     return " ".join((s or "").split())
 
 
-def _chunk_html(soup: BeautifulSoup) -> List[Dict[str, str]]:
+# elements whose text never counts as content (BeautifulSoup's get_text skips them too)
+_SKIP_TEXT = ("script", "style", "template")
+
+
+class _HtmlBlocks:
+    """
+    Stream an HTML file through lxml's parser-target interface (no DOM is built)
+    and yield (tag, strings) for each wanted element in document order. `strings`
+    are the element's stripped text nodes, nested wanted elements included, i.e.
+    what BeautifulSoup's get_text(strip=True) would join.
+    - body_only: ignore elements outside <body> (soup.body.descendants)
+    - keep_text: also keep up to that many characters of all document text in .text
+    """
+
+    def __init__(self, path: str, tags: Iterable[str], body_only: bool = False, keep_text: int = 0):
+        self.path = path
+        self.tags = frozenset(tags)
+        self.keep_text = keep_text
+        self.text: List[str] = []
+        self._kept = 0
+        self._body_only = body_only
+        self._in_body = not body_only
+        self._slots: Deque[list] = deque()  # [tag, strings, closed] in start order
+        self._open: List[list] = []
+        self._pending: List[str] = []
+        self._skip = 0
+
+    def __iter__(self) -> Iterator[Tuple[str, List[str]]]:
+        parser = etree.HTMLParser(target=self, encoding="utf-8")
+        with open(self.path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                parser.feed(chunk)
+                yield from self._closed()
+        parser.close()
+        yield from self._closed()
+
+    def _closed(self) -> Iterator[Tuple[str, List[str]]]:
+        # an outer element finishes after the ones nested in it; hold those back to keep start order
+        while self._slots and self._slots[0][2]:
+            tag, strings, _ = self._slots.popleft()
+            yield tag, strings
+
+    def _flush(self) -> None:
+        # one text node may arrive in several data() calls; strip it once, as a whole
+        if not self._pending:
+            return
+        s = "".join(self._pending).strip()
+        self._pending = []
+        if not s:
+            return
+        for slot in self._open:
+            slot[1].append(s)
+        if self._kept < self.keep_text:
+            s = " ".join(s.split())
+            self.text.append(s)
+            self._kept += len(s) + 1
+
+    # -- parser target callbacks --
+    def start(self, tag: str, attrib: Any) -> None:
+        self._flush()
+        if tag == "body":
+            self._in_body = True
+        if tag in _SKIP_TEXT:
+            self._skip += 1
+        if tag in self.tags and self._in_body:
+            slot = [tag, [], False]
+            self._slots.append(slot)
+            self._open.append(slot)
+
+    def end(self, tag: str) -> None:
+        self._flush()
+        if tag in _SKIP_TEXT:
+            self._skip -= 1
+        if tag == "body" and self._body_only:
+            self._in_body = False
+        if self._open and self._open[-1][0] == tag:
+            self._open.pop()[2] = True
+
+    def data(self, data: str) -> None:
+        if not self._skip:
+            self._pending.append(data)
+
+    def close(self) -> None:
+        self._flush()
+        for slot in self._open:
+            slot[2] = True
+        self._open = []
+
+
+def _chunk_blocks(blocks: Iterable[Tuple[str, str]], whole_text: Callable[[], str]) -> List[Dict[str, str]]:
     """
-    Very simple chunker:
+    Very simple chunker over (tag, text) blocks in document order:
     - Start a new chunk at each H1/H2.
     - Accumulate paragraph text until the next heading.
     - Keep the heading as title; use heading text as a tag.
@@ -85,8 +215,7 @@ def _chunk_html(soup: BeautifulSoup) -> List[Dict[str, str]]:
     cur_buf: List[str] = []
     cur_tag: str = ""
 
-    for el in soup.find_all(["h1", "h2", "p", "li", "pre", "code"]):
-        name = el.name.lower()
+    for name, txt in blocks:
         if name in ("h1", "h2"):
             # flush previous
             if cur_title and cur_buf:
@@ -97,57 +226,111 @@ def _chunk_html(soup: BeautifulSoup) -> List[Dict[str, str]]:
                         "tags": cur_tag,
                     }
                 )
-            cur_title = el.get_text(" ", strip=True)
+            cur_title = txt
             cur_tag = cur_title
             cur_buf = []
-        else:
-            txt = el.get_text(" ", strip=True)
-            if txt:
-                cur_buf.append(txt)
+        elif txt:
+            cur_buf.append(txt)
 
     if cur_title and cur_buf:
         chunks.append({"title": _norm(cur_title), "text": _norm("\n".join(cur_buf)), "tags": cur_tag})
 
     # fallback if no headings
     if not chunks:
-        whole = _norm(soup.get_text(" ", strip=True))
+        whole = _norm(whole_text())
         if whole:
             chunks.append({"title": "Notes", "text": whole[:6000], "tags": "General"})
     return chunks
 
 
+_CHUNK_TAGS = ("h1", "h2", "p", "li", "pre", "code")
+
+
+def _chunk_html_file(path: str) -> List[Dict[str, str]]:
+    """Streaming chunker: memory follows the extracted text, not the size of the DOM."""
+    blocks = _HtmlBlocks(path, _CHUNK_TAGS, keep_text=6000)
+    return _chunk_blocks(((name, " ".join(strings)) for name, strings in blocks), lambda: " ".join(blocks.text))
+
+
+def _soup_blocks(soup: BeautifulSoup) -> Iterator[Tuple[str, str]]:
+    # walk descendants lazily rather than materializing find_all()'s result list
+    for el in soup.descendants:
+        name = getattr(el, "name", None)
+        if name and name.lower() in _CHUNK_TAGS:
+            yield name.lower(), el.get_text(" ", strip=True)
+
+
+def _chunk_html(soup: BeautifulSoup) -> List[Dict[str, str]]:
+    """BeautifulSoup chunker; fallback for markup the streaming parser rejects."""
+    return _chunk_blocks(_soup_blocks(soup), lambda: soup.get_text(" ", strip=True))
+
+
 def ingest_html(path: str) -> int:
     """
     Parse an HTML export (e.g., your methodology.html), chunk it, and index into SQLite + FTS.
     Idempotent: uses stable ids based on (path, index, title).
     """
     path = os.path.expanduser(path)
-    with open(path, "rb") as f:
-        soup = BeautifulSoup(f.read(), "lxml")
-
-    chunks = _chunk_html(soup)
+    try:
+        chunks = _chunk_html_file(path)
+    except etree.LxmlError:
+        from bs4 import BeautifulSoup  # fallback only; retrieval never needs it
+        with open(path, "rb") as f:
+            chunks = _chunk_html(BeautifulSoup(f.read(), "lxml"))
 
     con = _conn()
     _init_db(con)
 
-    n = 0
+    rows = []
     for i, ch in enumerate(chunks):
         title = ch["title"]
-        text = ch["text"]
         tags_csv = ",".join(t.strip() for t in (ch.get("tags") or "General").split(",") if t.strip()) or "General"
-        cid = hashlib.sha1(f"{path}:{i}:{title}".encode("utf-8")).hexdigest()
-        _upsert_chunk(con, cid, title, text, tags_csv)
-        n += 1
+        rows.append((_chunk_id(path, i, title), title, ch["text"], tags_csv))
+    stale = []
+    if _has_legacy_ids(con):
+        stale = [hashlib.sha1(f"{path}:{i}:{ch['title']}".encode("utf-8")).hexdigest() for i, ch in enumerate(chunks)]
+    _upsert_chunks(con, rows, stale)
+    n = len(rows)
 
-    con.commit()
     con.close()
     return n
 
 
+# (db path, topic, k) -> rows. Topics repeat a lot (the agent asks from a tiny fixed
+# vocabulary), so most lookups skip SQLite; dropped whenever the DB changes (ingest).
+_RESULTS: Dict[Tuple[str, str, int], List[Dict[str, Any]]] = {}
+_RESULTS_MAX = 128
+_RESULTS_STAMP: tuple = ()
+
+
+def _db_stamp(p: str) -> tuple:
+    """(mtime, size) of the DB and its WAL; any commit moves at least one of them."""
+    stamp: List[Any] = [p]
+    for f in (p, p + "-wal"):
+        try:
+            st = os.stat(f)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
 def retrieve(topic: str, k: int = 4) -> List[Dict[str, Any]]:
     """
     Simple FTS-backed retrieval: MATCH on the topic and return text + metadata.
+    Results are memoized until the DB changes.
     """
+    global _RESULTS_STAMP
+    p = _db_path()
+    stamp = _db_stamp(p)
+    if stamp != _RESULTS_STAMP:
+        _RESULTS.clear()
+        _RESULTS_STAMP = stamp
+    key = (p, str(topic), int(k))
+    hit = _RESULTS.get(key)
+    if hit is not None:
+        return [dict(r) for r in hit]
+
     con = _conn()
     _init_db(con)
     cur = con.cursor()
@@ -159,8 +342,16 @@ def retrieve(topic: str, k: int = 4) -> List[Dict[str, Any]]:
         WHERE chunks_fts MATCH ?
         LIMIT ?;
         """,
-        (topic, int(k)),
+        (key[1], key[2]),
     ).fetchall()
     con.close()
 
-    return [{"id": r["id"], "title": r["title"], "tags": r["tags"], "text": r["text"]} for r in rows]
+    out = [{"id": r["id"], "title": r["title"], "tags": r["tags"], "text": r["text"]} for r in rows]
+    if len(_RESULTS) >= _RESULTS_MAX:
+        _RESULTS.clear()
+    # stamp again: opening the DB may itself have created it or its WAL
+    if _db_stamp(p) == stamp:
+        _RESULTS[key] = out
+    else:
+        _RESULTS_STAMP = ()
+    return [dict(r) for r in out]
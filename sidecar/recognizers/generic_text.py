@@ -1,16 +1,32 @@
-import re
+import os, re
 from typing import Dict, Any
-IP_RE = re.compile(r'(?:\b\d{1,3}\.){3}\d{1,3}\b')
-URL_RE = re.compile(r'\bhttps?://[\w\.-]+(?:/[\w\./%\-?=&]*)?')
-CVE_RE = re.compile(r'\bCVE-\d{4}-\d{4,7}\b', re.IGNORECASE)
-HASH_RE = re.compile(r'\b[a-f0-9]{32,64}\b', re.IGNORECASE)
+_IP = r'(?:\b\d{1,3}\.){3}\d{1,3}\b'
+_URL = r'\bhttps?://[\w\.-]+(?:/[\w\./%\-?=&]*)?'
+_CVE = r'(?i:\bCVE-\d{4}-\d{4,7}\b)'
+_HASH = r'(?i:\b[a-f0-9]{32,64}\b)'
+IP_RE = re.compile(_IP, re.ASCII)
+URL_RE = re.compile(_URL, re.ASCII)
+CVE_RE = re.compile(_CVE, re.ASCII)
+HASH_RE = re.compile(_HASH, re.ASCII)
+# one pass over the text; the alternatives never start on the same character
+COMBINED = re.compile(rf'(?P<url>{_URL})|(?P<ip>{_IP})|(?P<cve>{_CVE})|(?P<hash>{_HASH})', re.ASCII)
+# a URL swallows the IPs/CVEs/hashes inside it; those were always reported too
+INNER = re.compile(rf'(?P<ip>{_IP})|(?P<cve>{_CVE})|(?P<hash>{_HASH})', re.ASCII)
+# same patterns over raw bytes: the file is never decoded, only matches are
+_BCOMBINED = re.compile(COMBINED.pattern.encode())
 def parse_generic(path: str) -> Dict[str, Any]:
     out = {"indicators": []}
     try:
-        txt = open(path, "r", encoding="utf-8", errors="ignore").read()
-        for ip in set(IP_RE.findall(txt)): out["indicators"].append({"type":"ip", "value": ip})
-        for url in set(URL_RE.findall(txt)): out["indicators"].append({"type":"url", "value": url})
-        for cve in set(CVE_RE.findall(txt)): out["indicators"].append({"type":"cve", "value": cve.upper()})
-        for h in set(HASH_RE.findall(txt)): out["indicators"].append({"type":"hash", "value": h})
+        found = {"ip": set(), "url": set(), "cve": set(), "hash": set()}
+        # a plain read up to the size at open, not a mapping: a tool truncating the file
+        # meanwhile only shortens the read (a mapped page past the end raises SIGBUS)
+        with open(path, "rb") as f: data = f.read(os.fstat(f.fileno()).st_size or -1)  # -1: pipe
+        for m in _BCOMBINED.finditer(data): found[m.lastgroup].add(m.group())
+        found = {kind: {v.decode("ascii") for v in values} for kind, values in found.items()}
+        for url in found["url"]:
+            for m in INNER.finditer(url): found[m.lastgroup].add(m.group())
+        for kind, values in found.items():
+            if kind == "cve": values = {v.upper() for v in values}
+            out["indicators"].extend({"type": kind, "value": v} for v in values)
     except Exception as e: out["error"] = str(e)
     return out
@@ -1,14 +1,15 @@
-import xml.etree.ElementTree as ET
+from lxml import etree
 from typing import Dict, Any
 
 def parse_nmap_xml(path: str) -> Dict[str, Any]:
     facts = {"open_tcp": [], "open_udp": [], "hosts": []}
+    seen = set()
     try:
-        tree = ET.parse(path); root = tree.getroot()
-        for host in root.findall(".//host"):
+        # one <host> at a time; each is dropped once read, so memory stays flat on huge scans
+        for _, host in etree.iterparse(path, events=("end",), tag="host", resolve_entities=False, no_network=True):
             addr = host.find("./address"); ip = addr.get("addr") if addr is not None else None
-            if ip and ip not in facts["hosts"]: facts["hosts"].append(ip)
-            for port in host.findall(".//ports/port"):
+            if ip and ip not in seen: seen.add(ip); facts["hosts"].append(ip)
+            for port in host.iterfind(".//ports/port"):
                 proto = port.get("protocol",""); pno = int(port.get("portid","0"))
                 state = port.find("./state")
                 if state is None or state.get("state") != "open": continue
@@ -18,6 +19,8 @@ def parse_nmap_xml(path: str) -> Dict[str, Any]:
                 rec = {"host": ip, "port": pno, "service": service, "product": product}
                 if proto == "tcp": facts["open_tcp"].append(rec)
                 else: facts["open_udp"].append(rec)
+            host.clear()
+            while host.getprevious() is not None: del host.getparent()[0]
     except Exception as e:
         facts["error"] = str(e)
     return facts
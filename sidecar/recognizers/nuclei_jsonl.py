@@ -1,16 +1,17 @@
-import json
+import orjson
 from typing import Dict, Any
 
 def parse_nuclei_jsonl(path: str) -> Dict[str, Any]:
     out = {"nuclei": []}
     try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        append = out["nuclei"].append
+        with open(path, "rb") as f:
             for line in f:
-                line = line.strip()
-                if not line: continue
-                try: j = json.loads(line)
-                except Exception: continue
-                out["nuclei"].append({
+                # orjson skips the surrounding whitespace itself; blank lines just fail to parse
+                try: j = orjson.loads(line)
+                except orjson.JSONDecodeError: continue
+                if not isinstance(j, dict): continue
+                append({
                     "severity": j.get("info",{}).get("severity","info"),
                     "id": j.get("template-id") or j.get("id","unknown"),
                     "url": j.get("matched-at") or j.get("host"),
@@ -1,34 +1,76 @@
 # sidecar/ui/ui.py
 from __future__ import annotations
 
-import json
 import os
+import time
 from typing import Any, Dict, Optional
 
+import orjson
 from textual.app import App, ComposeResult
 from textual.widgets import Static
 from textual.containers import Vertical
 
 
+_BLOCK = 64 * 1024
+# bound on the work one tick can do when the tail is garbage or one record is huge
+_MAX_TAIL_BYTES = 1 << 20
+# _newest_event's answer when no record ends within that bound; shown as such, not
+# papered over with the older plan still on screen
+_TOO_LARGE: Dict[str, Any] = {}
+# the timer fires every _POLL s; the file is stat'ed every `stride` ticks, by time since the last change
+_POLL = 0.5
+_POLL_TIERS = ((5.0, 1), (120.0, 5))  # (idle below, stride): 0.5 s hot, 2.5 s warm
+_POLL_COLD = 20  # 10 s once idle for 2 minutes
+
+
+def _json_obj(line: bytes) -> Optional[Dict[str, Any]]:
+    line = line.strip()
+    if not line.startswith(b"{"):
+        return None
+    try:
+        obj = orjson.loads(line)
+    except orjson.JSONDecodeError:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def _rscan(data: bytes, lo: int, hi: int) -> Optional[Dict[str, Any]]:
+    """Last valid JSON object among the lines of data[lo:hi], walking back with rfind (no line list)."""
+    while True:
+        j = data.rfind(b"\n", lo, hi)
+        obj = _json_obj(data[max(j + 1, lo):hi])
+        if obj is not None or j < 0:
+            return obj
+        hi = j
+
+
 def _last_json_line(path: str) -> Optional[Dict[str, Any]]:
-    """Return the last valid JSON object from a jsonl file, or None."""
+    """
+    Return the last valid JSON object from a jsonl file, or None.
+    Reads 64 KiB blocks backwards from EOF, so the cost follows the size of the
+    last record, not of the file, and a record longer than a block is still whole.
+    Gives up after _MAX_TAIL_BYTES without a valid record.
+    """
     try:
         if not os.path.exists(path) or os.path.isdir(path):
             return None
         with open(path, "rb") as f:
-            try:
-                f.seek(-4096, os.SEEK_END)
-            except OSError:
-                f.seek(0)
-            chunk = f.read().decode("utf-8", errors="ignore").splitlines()
-        for line in reversed(chunk):
-            line = line.strip()
-            if not line or not line.startswith("{"):
-                continue
-            try:
-                return json.loads(line)
-            except Exception:
-                continue
+            end = pos = f.seek(0, os.SEEK_END)
+            head = b""  # start of a line that continues into the block after it
+            while pos > 0 and end - pos < _MAX_TAIL_BYTES:
+                n = min(_BLOCK, pos)
+                pos -= n
+                f.seek(pos)
+                data = f.read(n) + head
+                # the first piece may begin in an earlier block, unless this is the start of the file
+                first = data.find(b"\n") if pos > 0 else -1
+                if pos > 0 and first < 0:
+                    head = data
+                    continue
+                obj = _rscan(data, first + 1, len(data))
+                if obj is not None:
+                    return obj
+                head = data[:first] if pos > 0 else b""
     except Exception:
         pass
     return None
@@ -53,7 +95,11 @@ class SidecarUI(App):
     def __init__(self, audit_path: str):
         super().__init__()
         self.audit_path = os.path.expanduser(audit_path)
-        self._last_mtime: float = 0.0
+        self._inode: int = -1
+        self._offset: int = 0  # end of the last complete line already read
+        self._last_key: tuple = (0, 0, 0)  # (inode, mtime_ns, size) at the last tick
+        self._last_change = time.monotonic()
+        self._ticks = 0
         self.title_bar: Static | None = None
         self.status: Static | None = None
         self.details: Static | None = None
@@ -66,7 +112,7 @@ class SidecarUI(App):
 
     def on_mount(self) -> None:
         # Poll the audit file periodically and refresh if it changed
-        self.set_interval(0.5, self._tick)
+        self.set_interval(_POLL, self._tick)
 
     # ---------- rendering ----------
     def _render_details(self, evt: Dict[str, Any]) -> None:
@@ -99,18 +145,60 @@ class SidecarUI(App):
         self.details.update("\n".join(lines))
 
     # ---------- file polling ----------
+    def _newest_event(self) -> Optional[Dict[str, Any]]:
+        """
+        Newest record appended since the last tick. Only the new bytes are read;
+        the offset stops after the last complete line, so a record still being
+        written is picked up whole on a later tick.
+        """
+        try:
+            st = os.stat(self.audit_path)
+        except OSError:
+            return None
+        # one stat per tick; unchanged file (or only the same partial line pending): no IO
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key == self._last_key:
+            return None
+        self._last_key = key
+        self._last_change = time.monotonic()
+        if st.st_ino == self._inode and st.st_size == self._offset:
+            return None
+        with open(self.audit_path, "rb") as f:
+            if st.st_ino != self._inode or not 0 <= st.st_size - self._offset <= _MAX_TAIL_BYTES:
+                # first look, rotated/truncated, or too far behind to read it all: start from its tail
+                self._inode = st.st_ino
+                f.seek(max(0, st.st_size - _BLOCK))
+                block = f.read()
+                self._offset = st.st_size - len(block) + block.rfind(b"\n") + 1
+                evt = _last_json_line(self.audit_path)
+                return _TOO_LARGE if evt is None and st.st_size > _MAX_TAIL_BYTES else evt
+            f.seek(self._offset)
+            delta = f.read(st.st_size - self._offset)
+        cut = delta.rfind(b"\n") + 1
+        self._offset += cut
+        return _rscan(delta, 0, cut)
+
+    def _stride(self) -> int:
+        idle = time.monotonic() - self._last_change
+        for limit, stride in _POLL_TIERS:
+            if idle < limit:
+                return stride
+        return _POLL_COLD
+
     def _tick(self) -> None:
+        self._ticks += 1
+        if self._ticks % self._stride():
+            return  # idle: poll less often
         try:
-            mtime = os.path.getmtime(self.audit_path) if os.path.exists(self.audit_path) else 0.0
+            evt = self._newest_event()
         except Exception:
-            mtime = 0.0
-
-        if mtime <= self._last_mtime:
-            return
-        self._last_mtime = mtime
-
-        evt = _last_json_line(self.audit_path)
-        if evt:
+            evt = None
+        if evt is _TOO_LARGE:
+            if self.status:
+                self.status.update(f"following: {self.audit_path}    |    last record too large to display")
+            if self.details:
+                self.details.update("[dim]No readable record in the last 1 MiB of the audit log.[/dim]")
+        elif evt:
             if self.status:
                 last_cmd = str(evt.get("cmd", "") or "")
                 self.status.update(f"following: {self.audit_path}    |    last: {last_cmd if last_cmd else '—'}")
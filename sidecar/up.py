@@ -14,21 +14,28 @@ def _sh(*args, check=True, quiet=False):
     stderr = subprocess.DEVNULL if quiet else None
     return subprocess.run(list(args), check=check, stdout=stdout, stderr=stderr)
 
-def _sh_out(*args, check=True) -> str:
-    """Run tmux and return stdout (stripped)."""
-    res = subprocess.run(list(args), check=check, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    return (res.stdout or "").strip()
+def _tmux_chain(cmds) -> list:
+    """
+    One tmux argv running every command in order (tmux's own `;` sequencing), so
+    the whole layout costs one fork/exec instead of one per command.
+    """
+    argv = ["tmux"]
+    for cmd in cmds:
+        if len(argv) > 1:
+            argv.append(";")
+        # a trailing ';' would end the command early; tmux unescapes '\;'
+        argv.extend(a[:-1] + "\\;" if a.endswith(";") else a for a in cmd)
+    return argv
 
 
 def _read_env_file(path: str) -> dict:
     return load_env(path)
 
 
-def _load_dotenv_to_tmux(env: dict):
-    if not env:
-        return
-    for k, v in env.items():
-        _sh("tmux", "setenv", "-g", k, v, check=False, quiet=True)
+def _dotenv_to_tmux(env: dict) -> list:
+    # tmux rejects an empty name or one containing '=', and a failing command
+    # would abort the rest of the chained layout, so such keys are skipped
+    return [["setenv", "-g", k, v] for k, v in env.items() if k and "=" not in k]
 
 
 def up_main(provider=None, profile=None, session="sidecar", audit=None):
@@ -51,48 +58,42 @@ def up_main(provider=None, profile=None, session="sidecar", audit=None):
 
     # Reset session
     _sh("tmux", "kill-session", "-t", session, check=False, quiet=True)
-    _sh("tmux", "start-server", check=False, quiet=True)
-
-    # 3) Make env available to panes (tmux global env)
-    _load_dotenv_to_tmux(file_env)
-
-    # 4) tmux ergonomics
-    _sh("tmux", "set-option", "-g", "mouse", "on", check=False, quiet=True)
-    _sh("tmux", "set-option", "-g", "set-clipboard", "on", check=False, quiet=True)
-    _sh("tmux", "set-window-option", "-g", "mode-keys", "vi", check=False, quiet=True)
 
     shell = os.environ.get("SHELL", "/bin/bash")
     py = sys.executable  # venv python
     ui_percent = os.environ.get("AIC_UI_PERCENT", "60")  # bottom UI height %
 
-    # 5) Create window and capture the initial (top-left) pane id
-    _sh("tmux", "new-session", "-d", "-s", session, "-n", "ops", shell)
-    pentest_id = _sh_out("tmux", "display-message", "-p", "-t", f"{session}:ops.0", "#{pane_id}")
-
-    # 6) Split vertical FROM pentest -> new pane is bottom (UI). Capture its id.
-    _sh("tmux", "select-pane", "-t", pentest_id)
-    _sh("tmux", "split-window", "-v", "-p", ui_percent, "-t", pentest_id, shell)
-    ui_id = _sh_out("tmux", "display-message", "-p", "#{pane_id}")  # new pane is selected by default
-
-    # 7) Split horizontal FROM pentest -> new pane is right (agent). Capture its id.
-    _sh("tmux", "select-pane", "-t", pentest_id)
-    _sh("tmux", "split-window", "-h", "-p", "50", "-t", pentest_id, shell)
-    agent_id = _sh_out("tmux", "display-message", "-p", "#{pane_id}")  # new pane is selected
-
-    # 8) Name panes (so the status line shows them clearly)
-    _sh("tmux", "select-pane", "-t", pentest_id); _sh("tmux", "select-pane", "-T", "pentest-shell")
-    _sh("tmux", "select-pane", "-t", agent_id);   _sh("tmux", "select-pane", "-T", "agent")
-    _sh("tmux", "select-pane", "-t", ui_id);      _sh("tmux", "select-pane", "-T", "ui")
-
-    # 9) Launch UI (bottom)
-    _sh("tmux", "send-keys", "-t", ui_id, f"{py} -m sidecar ui --audit {audit}", "Enter")
-
-    # 10) Launch Agent (top-right) with provider/profile
     agent_cmd = f"{py} -m sidecar agent --provider {provider} --profile {profile}"
     if allow_cloud:
         agent_cmd += " --allow-cloud"
-    _sh("tmux", "send-keys", "-t", agent_id, agent_cmd, "Enter")
 
-    # 11) Focus pentest pane and attach
-    _sh("tmux", "select-pane", "-t", pentest_id)
+    # Everything below runs as one tmux command sequence. A new/split pane becomes
+    # the current one, so titles and send-keys apply to it without pane ids.
+    cmds = []
+    # 3) Make env available to panes (tmux global env)
+    cmds += _dotenv_to_tmux(file_env)
+    # 4) tmux ergonomics (best effort: -q ignores options this tmux doesn't know)
+    cmds += [
+        ["set-option", "-gq", "mouse", "on"],
+        ["set-option", "-gq", "set-clipboard", "on"],
+        ["set-window-option", "-gq", "mode-keys", "vi"],
+    ]
+    cmds += [
+        # 5) Create window; the initial pane is the pentest shell (top-left)
+        ["new-session", "-d", "-s", session, "-n", "ops", shell],
+        ["select-pane", "-T", "pentest-shell"],
+        # 6) Split vertical FROM pentest -> new pane is bottom (UI); launch the UI in it
+        ["split-window", "-v", "-p", ui_percent, "-t", f"{session}:ops.{{top}}", shell],
+        ["select-pane", "-T", "ui"],
+        ["send-keys", f"{py} -m sidecar ui --audit {audit}", "Enter"],
+        # 7) Split horizontal FROM pentest -> new pane is right (agent); launch the agent
+        ["split-window", "-h", "-p", "50", "-t", f"{session}:ops.{{top}}", shell],
+        ["select-pane", "-T", "agent"],
+        ["send-keys", agent_cmd, "Enter"],
+        # 8) Focus pentest pane
+        ["select-pane", "-t", f"{session}:ops.{{top-left}}"],
+    ]
+    _sh(*_tmux_chain(cmds))
+
+    # 9) Attach
     os.execvp("tmux", ["tmux", "attach", "-t", session])
@@ -1,4 +1,5 @@
-import os, yaml, pathlib
+import copy, os, pathlib
+from functools import lru_cache
 
 DEFAULT_CFG = {
     "profiles": {
@@ -18,20 +19,34 @@ DEFAULT_CFG = {
 }
 
 def load_config():
+    """Parsed config; the YAML is only re-read when the file changes. Callers get their own copy."""
     p = pathlib.Path(os.path.expanduser("~/.sidecar/config.yaml"))
+    try:
+        mtime = p.stat().st_mtime_ns
+    except OSError:
+        mtime = 0
+    return copy.deepcopy(_load_config(str(p), mtime))
+
+@lru_cache(maxsize=1)
+def _load_config(path: str, mtime: int):
+    import yaml  # only needed when the config is (re)read
+    p = pathlib.Path(path)
     if p.exists():
         with p.open("r", encoding="utf-8") as f:
-            cfg = yaml.safe_load(f) or {}
-        def deepmerge(a,b):
-            for k,v in b.items():
-                if k not in a:
-                    a[k]=v
-                elif isinstance(v, dict):
-                    a[k]=deepmerge(a.get(k,{}), v)
-            return a
-        return deepmerge(cfg, DEFAULT_CFG.copy())
+            # libyaml's C loader when PyYAML was built with it; same safe subset, several times faster
+            cfg = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
+        return _merge_defaults(cfg, DEFAULT_CFG)
     else:
         p.parent.mkdir(parents=True, exist_ok=True)
         with p.open("w", encoding="utf-8") as f:
             yaml.safe_dump(DEFAULT_CFG, f, sort_keys=False)
-        return DEFAULT_CFG
+        return _merge_defaults({}, DEFAULT_CFG)
+
+def _merge_defaults(user, defaults):
+    """Fill the keys missing from `user` in place; defaults are deep-copied, never shared."""
+    for k, v in defaults.items():
+        if k not in user:
+            user[k] = copy.deepcopy(v)
+        elif isinstance(v, dict) and isinstance(user[k], dict):
+            _merge_defaults(user[k], v)
+    return user
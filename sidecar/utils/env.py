@@ -16,16 +16,22 @@ def load_env(path: str = "~/.sidecar/.env") -> Dict[str, str]:
       - No quotes stripping (write your .env without surrounding quotes).
     """
     p = pathlib.Path(os.path.expanduser(path))
-    if not p.exists():
+    try:
+        data = p.read_bytes()
+    except FileNotFoundError:
         return {}
 
     env: Dict[str, str] = {}
-    for raw in p.read_text(encoding="utf-8", errors="ignore").splitlines():
+    # work on bytes and decode only the key and value spans
+    for raw in data.split(b"\n"):
         line = raw.strip()
-        if not line or line.startswith("#") or "=" not in line:
+        if not line or line[:1] == b"#":
             continue
-        k, v = line.split("=", 1)
-        k, v = k.strip(), v.strip()
+        eq = line.find(b"=")
+        if eq < 0:
+            continue
+        k = line[:eq].strip().decode("utf-8", "ignore")
+        v = line[eq + 1:].strip().decode("utf-8", "ignore")
         env[k] = v
         # only set default (do not overwrite already-set real env)
         os.environ.setdefault(k, v)
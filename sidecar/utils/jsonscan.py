@@ -0,0 +1,64 @@
+# sidecar/sidecar/utils/jsonscan.py
+from __future__ import annotations
+
+import re
+
+import orjson
+
+# upper bound on how much of a model reply is scanned for the object
+MAX_SCAN = 64 * 1024
+
+# the only characters that matter to brace matching; everything else is skipped in C
+_JSON_TOKENS = re.compile(r'[{}"\\]')
+
+
+def extract_json(s: str, partial: bool = False, max_scan: int = MAX_SCAN) -> dict | None:
+    """
+    First top-level balanced {...} object in the text that parses.
+    Braces inside string literals are ignored, so prose after the object
+    ("... } here is why") or a brace in a reason string can't skew the slice.
+    Objects nested in a span that fails to parse are never candidates: a broken
+    plan must not come back as one of its own next_actions. Likewise an object
+    that never closes ends the scan (with `partial`, text still streaming in,
+    that means "wait").
+    Only `max_scan` characters from the first "{" are looked at, so a runaway
+    reply costs bounded work.
+    """
+    if not s:
+        return None
+    start = s.find("{")
+    end = start + max_scan
+    while start != -1 and start < end:
+        depth = 0
+        in_str = False
+        skip = -1  # position of a character escaped by a backslash
+        close = -1
+        for m in _JSON_TOKENS.finditer(s, start, end):
+            i = m.start()
+            if i == skip:
+                continue
+            ch = s[i]
+            if in_str:
+                if ch == "\\":
+                    skip = i + 1
+                elif ch == '"':
+                    in_str = False
+            elif ch == '"':
+                in_str = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    close = i
+                    break
+        if close == -1:
+            return None
+        try:
+            obj = orjson.loads(s[start : close + 1])
+        except orjson.JSONDecodeError:
+            obj = None
+        if isinstance(obj, dict):
+            return obj
+        start = s.find("{", close + 1)
+    return None
@@ -1,4 +1,4 @@
-import json
+import orjson
 
 TEMPLATE = """You are SIDEcar, a penetration-testing copilot. You see a running shell session for a CTF event.
 You will propose concrete next steps based on:
@@ -26,7 +26,12 @@ INPUT:
 {input_blob}
 """
 
-def build_prompt(payload: dict) -> str:
+# Split once at import: building a prompt is then two concatenations, no format parsing.
+# Everything before the input blob is identical across calls (cacheable prefix).
+_PROMPT_HEAD, _PROMPT_TAIL = (part.replace("{{", "{").replace("}}", "}") for part in TEMPLATE.split("{input_blob}"))
+_STATIC_PREFIX = _PROMPT_HEAD
+
+def _input_blob(payload: dict) -> str:
     # Payload is already redacted upstream if needed
     # Keep only the essentials to keep prompts small
     input_compact = {
@@ -38,4 +43,12 @@ def build_prompt(payload: dict) -> str:
         "retrieved_snippets": payload.get("retrieved_snippets", [])[:3],
         "recent_cmds": [e.get("cmd") for e in payload.get("recent_events", [])[-6:]]
     }
-    return TEMPLATE.format(input_blob=json.dumps(input_compact, ensure_ascii=False))
+    # compact separators, UTF-8 kept as is: fewer bytes sent to the provider
+    return orjson.dumps(input_compact).decode()
+
+def build_prompt(payload: dict) -> str:
+    return _PROMPT_HEAD + _input_blob(payload) + _PROMPT_TAIL
+
+def build_prompt_parts(payload: dict) -> tuple[str, str]:
+    """(static instructions, per-event input); concatenated they equal build_prompt(payload)."""
+    return _STATIC_PREFIX, _input_blob(payload) + _PROMPT_TAIL
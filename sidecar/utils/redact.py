@@ -2,31 +2,66 @@ import re
 from typing import Any, Dict
 
 # Only private IPv4 ranges are redacted; public IPs are preserved for pentesting context.
+# Every pattern starts at a word boundary (prefixed below); flags are scoped per pattern.
 _PATTERNS = [
-    (re.compile(r'(?i)\bapi[_-]?key\s*[:=]\s*["\']?([A-Za-z0-9._\-]{12,})["\']?'), 'API_KEY'),
-    (re.compile(r'(?i)\bsecret[_-]?key\s*[:=]\s*["\']?([^"\']{8,})["\']?'), 'SECRET'),
-    (re.compile(r'(?i)\bpassword\s*[:=]\s*["\']?([^"\']{4,})["\']?'), 'PASSWORD'),
-    (re.compile(r'(?i)\bBearer\s+[A-Za-z0-9\-_\.=]+'), 'TOKEN'),
-    (re.compile(r'\b[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,}\b'), 'JWT'),
-    (re.compile(r'\b(?:10\.(?:\d{1,3}\.){2}\d{1,3}|192\.168\.(?:\d{1,3}\.)\d{1,3}|172\.(?:1[6-9]|2\d|3[0-1])\.(?:\d{1,3}\.)\d{1,3})\b'), 'IP_PRIV'),
+    (r'(?i:api[_-]?key\s*[:=]\s*["\']?[A-Za-z0-9._\-]{12,}["\']?)', 'API_KEY'),
+    (r'(?i:secret[_-]?key\s*[:=]\s*["\']?[^"\']{8,}["\']?)', 'SECRET'),
+    (r'(?i:password\s*[:=]\s*["\']?[^"\']{4,}["\']?)', 'PASSWORD'),
+    (r'(?i:Bearer\s+[A-Za-z0-9\-_\.=]+)', 'TOKEN'),
+    (r'[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,}\b', 'JWT'),
+    (r'(?:10\.(?:\d{1,3}\.){2}\d{1,3}|192\.168\.(?:\d{1,3}\.)\d{1,3}|172\.(?:1[6-9]|2\d|3[0-1])\.(?:\d{1,3}\.)\d{1,3})\b', 'IP_PRIV'),
 ]
 
+# Substitution stays one pattern at a time, in order: a single alternation would let
+# whichever match starts first win (a password assignment swallowing the api key and
+# its opening quote right after it), and secrets would go out in cleartext.
+_SUBS = [(re.compile(r"\b" + pat), f"<{label}>") for pat, label in _PATTERNS]
+
+# Prefilter only: matches iff some pattern does, in one pass with the \b checked once
+# per position. Strings without a hit (nearly all of them) skip the six passes.
+_COMBINED = re.compile(r"\b(?:" + "|".join(pat for pat, _ in _PATTERNS) + ")")
+
+# Shortest possible match of any pattern ("10.0.0.1", "Bearer x"): shorter strings are
+# never searched. Values under these keys are timestamps, exit codes and enums.
+_MIN_LEN = 8
+_SKIP_KEYS = frozenset(("ts", "exit", "profile", "noise", "safety"))
+
+def _redact_subs(s: str) -> str:
+    for pat, label in _SUBS:
+        s = pat.sub(label, s)
+    return s
+
 def _redact_text(s: str) -> str:
-    out = s
-    for pat, label in _PATTERNS:
-        out = pat.sub(f'<{label}>', out)
-    return out
+    return s if _COMBINED.search(s) is None else _redact_subs(s)
 
 def redact(payload: Dict[str, Any], allow_cloud: bool=False) -> Dict[str, Any]:
-    """Redact sensitive strings from a nested JSON-like payload unless allow_cloud=True."""
+    """Redact sensitive strings from a nested JSON-like payload unless allow_cloud=True.
+
+    The caller's payload is never modified: only the containers on the path to a
+    redacted string are copied, everything else is shared, and a payload with
+    nothing to redact comes back as the same object.
+    """
     if allow_cloud:
         return payload
-    def walk(x):
-        if isinstance(x, dict):
-            return {k: walk(v) for k, v in x.items()}
-        if isinstance(x, list):
-            return [walk(v) for v in x]
-        if isinstance(x, str):
-            return _redact_text(x)
-        return x
-    return walk(payload)
+    # slot: [original container, its private copy or None, parent slot, key in parent];
+    # the root is a one-item box that is writable from the start
+    box = [payload]
+    stack = [[box, box, None, None]]
+    search = _COMBINED.search
+    while stack:
+        slot = stack.pop()
+        node = slot[0]
+        for key, x in (node.items() if isinstance(node, dict) else enumerate(node)):
+            if key in _SKIP_KEYS:
+                continue
+            if isinstance(x, (dict, list)):
+                stack.append([x, None, slot, key])
+            elif isinstance(x, str) and len(x) >= _MIN_LEN and search(x) is not None:
+                x, s = _redact_subs(x), slot
+                # copy-on-write from the hit up to the first ancestor that is already a copy
+                while s[1] is None:
+                    s[1] = dict(s[0]) if isinstance(s[0], dict) else list(s[0])
+                    s[1][key] = x
+                    x, key, s = s[1], s[3], s[2]
+                s[1][key] = x
+    return box[0]
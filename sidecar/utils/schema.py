@@ -1,20 +1,83 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
 
-class LogEvent(BaseModel):
-    ts: Optional[str] = ""
+import orjson
+
+# Plain dataclasses: these are built once per log line / plan, and validation is
+# only needed where the input is untrusted (validate / from_json).
+_SAFETY = frozenset(("read-only", "intrusive", "exploit"))
+_NOISE = frozenset(("low", "med", "high"))
+
+def _str(d: Dict[str, Any], k: str, default: Optional[str] = "") -> Optional[str]:
+    v = d.get(k, default)
+    if v is not None and not isinstance(v, str):
+        raise ValueError(f"{k}: expected a string")
+    return v
+
+def _int(d: Dict[str, Any], k: str) -> int:
+    v = d.get(k, 0)
+    if isinstance(v, int):  # bool included, as 0/1
+        return int(v)
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    if isinstance(v, str):
+        return int(v)  # ValueError when not an integer literal
+    raise ValueError(f"{k}: expected an integer")
+
+@dataclass(slots=True)
+class LogEvent:
     cmd: str
+    ts: Optional[str] = ""
     exit: int = 0
     cwd: Optional[str] = ""
     out: Optional[str] = ""
 
-class Suggestion(BaseModel):
+    @classmethod
+    def validate(cls, d: Any) -> "LogEvent":
+        """Build from a decoded session-log record; ValueError if it doesn't fit. Unknown keys are ignored."""
+        if not isinstance(d, dict) or not isinstance(d.get("cmd"), str):
+            raise ValueError("expected an object with a string cmd")
+        return cls(cmd=d["cmd"], ts=_str(d, "ts"), exit=_int(d, "exit"), cwd=_str(d, "cwd"), out=_str(d, "out"))
+
+    @classmethod
+    def from_json(cls, line: "str | bytes") -> "LogEvent":
+        try:
+            return cls.validate(orjson.loads(line))
+        except orjson.JSONDecodeError as e:
+            raise ValueError(str(e)) from e
+
+@dataclass(slots=True)
+class Suggestion:
     cmd: str
     reason: str = ""
-    safety: str = Field(pattern="^(read-only|intrusive|exploit)$")
-    noise: str = Field(pattern="^(low|med|high)$")
+    safety: str = ""
+    noise: str = ""
+
+    @classmethod
+    def validate(cls, d: Any) -> "Suggestion":
+        if not isinstance(d, dict) or not isinstance(d.get("cmd"), str):
+            raise ValueError("expected an object with a string cmd")
+        s = cls(cmd=d["cmd"], reason=_str(d, "reason"), safety=d.get("safety"), noise=d.get("noise"))
+        if s.safety not in _SAFETY or s.noise not in _NOISE:
+            raise ValueError("safety/noise: missing or not one of the known values")
+        return s
+
+@dataclass(slots=True)
+class Plan:
+    next_actions: List[Suggestion] = field(default_factory=list)
+    notes: List[str] = field(default_factory=list)
+    escalation_paths: List[str] = field(default_factory=list)
 
-class Plan(BaseModel):
-    next_actions: List[Suggestion] = []
-    notes: List[str] = []
-    escalation_paths: List[str] = []
+    @classmethod
+    def validate(cls, d: Any) -> "Plan":
+        if not isinstance(d, dict):
+            raise ValueError("expected an object")
+        def strs(k: str) -> List[str]:
+            v = d.get(k, [])
+            if not isinstance(v, list) or not all(isinstance(x, str) for x in v):
+                raise ValueError(f"{k}: expected a list of strings")
+            return v
+        actions = d.get("next_actions", [])
+        if not isinstance(actions, list):
+            raise ValueError("next_actions: expected a list")
+        return cls([Suggestion.validate(a) for a in actions], strs("notes"), strs("escalation_paths"))
@@ -0,0 +1,11 @@
+import shlex
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1024)
+def tokenize(cmd: str) -> tuple[str, ...]:
+    """Shell-style tokens (quoted paths stay whole); memoized since commands repeat."""
+    try:
+        return tuple(shlex.split(cmd, posix=True))
+    except ValueError:  # unbalanced quotes: the hook logged a partial line
+        return tuple(cmd.split())
@@ -0,0 +1,49 @@
+from sidecar.extract.generic import extract_from_file, extract_from_text, scan_file
+
+
+def test_fused_scan_keeps_hosts_inside_urls_and_emails():
+    f = extract_from_text("GET http://10.10.10.5:8080/admin then mail root@corp.local; CVE-2021-44228 on dc01.corp.local")
+    assert f["entities"]["urls"] == ["http://10.10.10.5:8080/admin"]
+    assert f["entities"]["ips"] == ["10.10.10.5"]
+    assert f["entities"]["emails"] == ["root@corp.local"]
+    assert f["entities"]["domains"] == ["corp.local", "dc01.corp.local"]
+    assert f["vulns"]["cves"] == ["CVE-2021-44228"]
+
+
+def test_cves_and_domains_inside_urls_are_kept():
+    f = extract_from_text("see https://nvd.nist.gov/vuln/detail/CVE-2021-44228 and "
+                          "https://cve.mitre.org/cgi-bin/cvename.cgi?name=CVE-2022-22965")
+    assert f["vulns"]["cves"] == ["CVE-2021-44228", "CVE-2022-22965"]
+    assert f["entities"]["domains"] == ["cvename.cgi"]
+
+
+def test_domain_starting_with_an_ip_keeps_both():
+    f = extract_from_text("callback to 10.10.14.3.nip.io")
+    assert f["entities"]["domains"] == ["10.10.14.3.nip.io"]
+    assert f["entities"]["ips"] == ["10.10.14.3"]
+
+
+def test_growing_file_rescans_only_the_tail(tmp_path):
+    p = tmp_path / "scan.txt"
+    p.write_text("host 10.0.0.1\npartial http://")
+    first = scan_file(str(p))
+    assert scan_file(str(p)) is first
+    with p.open("a") as f:
+        f.write("10.0.0.2/x\nCVE-2020-1472\n")
+    grown = extract_from_file(str(p))
+    assert grown["entities"]["ips"] == ["10.0.0.1", "10.0.0.2"]
+    assert grown["entities"]["urls"] == ["http://10.0.0.2/x"]
+    assert grown["vulns"]["cves"] == ["CVE-2020-1472"]
+    assert grown["indicators"] == extract_from_text(p.read_text())["indicators"]
+
+
+def test_rewritten_file_with_same_inode_is_rescanned(tmp_path):
+    p = tmp_path / "out.txt"
+    p.write_text("host 10.0.0.1\n")
+    assert sorted(scan_file(str(p)).ips) == ["10.0.0.1"]
+    with p.open("r+") as f:  # truncate and rewrite in place, as `cmd > out.txt` does
+        f.truncate(0)
+        f.write("host 10.0.0.9 CVE-2021-44228\nmore output\n")
+    facts = extract_from_file(str(p))
+    assert facts["entities"]["ips"] == ["10.0.0.9"]
+    assert facts["vulns"]["cves"] == ["CVE-2021-44228"]
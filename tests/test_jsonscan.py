@@ -0,0 +1,7 @@
+from sidecar.utils.jsonscan import extract_json
+
+
+def test_broken_plan_does_not_fall_back_to_a_nested_action():
+    assert extract_json('{"next_actions": [{"cmd": "id", "reason": "x"}], "notes": [oops]}') is None
+    assert extract_json('{"next_actions": [{"cmd": "id", "reason": "x"}') is None
+    assert extract_json('prose {not json} then {"notes": ["ok"]}') == {"notes": ["ok"]}
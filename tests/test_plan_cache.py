@@ -0,0 +1,15 @@
+from sidecar.agent.plan_cache import PlanCache
+
+
+def _payload(cmd, recent=()):
+    return {"profile": "htb", "cwd": "/w", "exit": 0, "parsed_facts": {}, "retrieved_snippets": [],
+            "last_cmd": cmd, "recent_events": [{"cmd": c, "exit": 0, "cwd": "/w"} for c in recent]}
+
+
+def test_near_hit_needs_the_same_command_tokens():
+    cache = PlanCache()
+    base = "sqlmap -u 'http://10.10.10.5/item.php?id=1' --batch --level 5 --risk 3 --dbs"
+    cache.put("openai", "m", _payload(base), {"notes": ["dbs"]})
+    respaced = "sqlmap  -u \"http://10.10.10.5/item.php?id=1\" --batch --level 5 --risk 3 --dbs"
+    assert cache.get("openai", "m", _payload(respaced, ["id"])) == ({"notes": ["dbs"]}, "near")
+    assert cache.get("openai", "m", _payload(base.replace("--dbs", "--dump"))) is None
@@ -0,0 +1,12 @@
+from sidecar.utils.redact import redact
+
+
+def test_password_match_does_not_swallow_following_api_key():
+    out = redact({"out": 'password=hunter2 api_key="AKIAIOSFODNN7EXAMPLE1"'})
+    assert "AKIAIOSFODNN7EXAMPLE1" not in out["out"]
+    assert out["out"] == "<PASSWORD>"
+
+
+def test_clean_payload_is_returned_untouched():
+    payload = {"cmd": "nmap -sV 8.8.8.8", "facts": [{"port": 53}]}
+    assert redact(payload) is payload
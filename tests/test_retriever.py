@@ -0,0 +1,32 @@
+import hashlib
+import sqlite3
+
+from sidecar.rag import retriever
+
+
+def test_legacy_ids_of_every_file_are_migrated(tmp_path, monkeypatch):
+    db = tmp_path / "rag.sqlite"
+    monkeypatch.setenv("AIC_RAG_DB", str(db))
+    a, b = tmp_path / "a.html", tmp_path / "b.html"
+    a.write_text("<html><body><h1>SMB</h1><p>enum shares</p><h1>Kerberos</h1><p>kerberoast spns</p></body></html>")
+    b.write_text("<html><body><h1>Creds</h1><p>spray passwords</p><h1>Web</h1><p>ffuf dirs</p></body></html>")
+    retriever.ingest_html(str(a))
+    retriever.ingest_html(str(b))
+
+    # rewrite the index as an older version left it: sha1 ids, user_version 0
+    con = sqlite3.connect(db)
+    rows = con.execute("SELECT id,title,text,tags FROM chunks").fetchall()
+    ids = {retriever._chunk_id(str(p), i, t): hashlib.sha1(f"{p}:{i}:{t}".encode()).hexdigest()
+           for p in (a, b) for i, t in enumerate(("SMB", "Kerberos") if p == a else ("Creds", "Web"))}
+    con.execute("DELETE FROM chunks")
+    con.executemany("INSERT INTO chunks VALUES (?,?,?,?)", [(ids[r[0]],) + r[1:] for r in rows])
+    con.execute("PRAGMA user_version=0")
+    con.commit()
+    con.close()
+
+    retriever.ingest_html(str(a))
+    retriever.ingest_html(str(b))
+    con = sqlite3.connect(db)
+    assert con.execute("SELECT count(*) FROM chunks").fetchone()[0] == 4
+    con.close()
+    assert [r["title"] for r in retriever.retrieve("spray")] == ["Creds"]